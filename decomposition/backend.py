@@ -0,0 +1,151 @@
+'''
+This is a prototype module that defines a small array-backend dispatch layer.
+A backend wraps an array module (numpy, cupy, ...) behind one namespace object so
+that the decomposition code and the benchmark scripts share a single code path.
+Backends are registered by name and selected at runtime, either explicitly or via
+the TENSORDECOMP_BACKEND environment variable. numpy is the only required package.
+'''
+import os
+import time
+
+
+class Backend:
+    """
+    Array namespace object. Attribute lookups that are not defined here fall through
+    to the wrapped array module, so backend.full, backend.linalg.norm, etc. behave
+    exactly like the module functions.
+    """
+
+    def __init__( self, name, module, synchronize=None, to_numpy=None, suffix=None ):
+        """
+        :param name: name the backend is registered under
+        :param module: array module implementing the numpy API
+        :param synchronize: callable blocking until queued device work is done, or None
+        :param to_numpy: callable converting a backend array to a numpy array, or None
+        :param suffix: suffix appended to data and figure file names for this backend
+        """
+        self.name = name
+        self.xp = module
+        self._synchronize = synchronize
+        self._to_numpy = to_numpy
+        self.suffix = '' if suffix is None else suffix
+
+    def __getattr__( self, attr ):
+        return getattr( self.xp, attr )
+
+    def __repr__( self ):
+        return 'Backend(' + self.name + ')'
+
+    def synchronize( self ):
+        """
+        Block until all work queued on the device has finished.
+        This is a no-op for host backends.
+        """
+        if self._synchronize is not None:
+            self._synchronize()
+
+    def to_numpy( self, a ):
+        """
+        :param a: array allocated by this backend
+        :return : numpy copy (or view, for host backends) of a
+        """
+        if self._to_numpy is not None:
+            return self._to_numpy( a )
+        return a
+
+
+def _numpy_backend():
+    import numpy as np
+    return Backend( 'numpy', np )
+
+def _cupy_backend():
+    import cupy as cp
+    return Backend( 'cupy', cp,
+            synchronize=cp.cuda.Stream.null.synchronize,
+            to_numpy=cp.asnumpy,
+            suffix='_cuda' )
+
+
+_factories = {}
+_suffixes = {}
+_instances = {}
+_active = None
+
+
+def register_backend( name, factory, suffix=None ):
+    """
+    Register a new backend. The factory is only called the first time the backend
+    is requested, so optional array modules are imported lazily.
+    :param name: name to register the backend under
+    :param factory: zero-argument callable returning a Backend
+    :param suffix: data file suffix for this backend, defaults to '_' + name
+    """
+    _factories[name] = factory
+    _suffixes[name] = '_' + name if suffix is None else suffix
+    _instances.pop( name, None )
+
+def available_backends():
+    """
+    :return : sorted list of registered backend names
+    """
+    return sorted( _factories )
+
+def data_suffix( name ):
+    """
+    Look up the data file suffix of a backend without importing its array module.
+    :param name: registered backend name
+    :return : file name suffix
+    """
+    if name not in _suffixes:
+        raise ValueError( 'unknown backend ' + repr( name ) + ', expected one of ' + str( available_backends() ) )
+    return _suffixes[name]
+
+def get_backend( name=None ):
+    """
+    :param name: registered backend name, or None for the active backend
+    :return : Backend instance
+    """
+    if name is None:
+        if _active is None:
+            set_backend( os.environ.get( 'TENSORDECOMP_BACKEND', 'numpy' ) )
+        return _active
+    if name not in _instances:
+        if name not in _factories:
+            raise ValueError( 'unknown backend ' + repr( name ) + ', expected one of ' + str( available_backends() ) )
+        instance = _factories[name]()
+#       the registry owns the file suffix, so data written through the instance lands in data_suffix( name )
+        instance.suffix = _suffixes[name]
+        _instances[name] = instance
+    return _instances[name]
+
+def set_backend( name ):
+    """
+    Select the backend used by default in lin_alg_proto, cp_proto and the benchmarks.
+    :param name: registered backend name
+    :return : the newly active Backend
+    """
+    global _active
+    _active = get_backend( name )
+    return _active
+
+def time_call( func, num_samples, backend=None ):
+    """
+    Time num_samples calls of func, synchronizing the device before starting the
+    clock and after the last call so queued asynchronous work is accounted for.
+    :param func: zero-argument callable to time
+    :param num_samples: number of calls
+    :param backend: Backend to synchronize, defaults to the active backend
+    :return : total elapsed wall clock time in seconds
+    """
+    if backend is None:
+        backend = get_backend()
+    backend.synchronize()
+    start = time.perf_counter()
+    for i in range( 0 , num_samples ):
+        func()
+    backend.synchronize()
+    return time.perf_counter() - start
+
+
+register_backend( 'numpy', _numpy_backend, suffix='' )
+register_backend( 'cupy', _cupy_backend, suffix='_cuda' )
@@ -0,0 +1,125 @@
+'''
+This is a prototype module that defines a compact CP model object for serving.
+A rank R model of an N-way tensor is a weight per component and N factor
+matrices; any entry is a weighted sum over the components of a product of N
+factor entries, so point queries cost O(N R) no matter how large the tensor is.
+Batches of index tuples are answered with one gather per mode and a single
+product, sub-blocks are rebuilt from the selected factor rows only, and norms
+and inner products between models are computed from the factor Gram matrices.
+'''
+import backend as bk
+
+
+class CPModel:
+    """
+    Kruskal tensor: sum_r weights[r] * factors[0][:, r] o ... o factors[N-1][:, r].
+    Slots only, so a model costs its arrays plus a few pointers.
+    """
+
+    __slots__ = ( 'weights', 'factors', 'shape' )
+
+    def __init__( self, weights, factors ):
+        """
+        :param weights: vector with one weight per component
+        :param factors: list of factor matrices, one per mode, all with one column per component
+        """
+        xp = bk.get_backend()
+        self.factors = [ xp.ascontiguousarray( f ) for f in factors ]
+        self.weights = xp.asarray( weights )
+        self.shape = tuple( f.shape[0] for f in self.factors )
+        for f in self.factors:
+            if f.shape[1] != self.weights.shape[0]:
+                raise ValueError( 'every factor needs one column per weight, got ' + str( f.shape )
+                        + ' for ' + str( self.weights.shape[0] ) + ' weights' )
+
+    @classmethod
+    def from_decomp( cls, lambdas, factor_matrices ):
+        """
+        build a model from the (lambdas, factor_matrices) pair returned by cp_proto.cp_decomp,
+        whose lambdas hold one scale per mode that applies to every component
+        :param lambdas: per-mode scales
+        :param factor_matrices: list of factor matrices
+        :return : CPModel with equal recomposition
+        """
+        xp = bk.get_backend()
+        scale = float( xp.prod( xp.asarray( lambdas ) ) )
+        return cls( xp.full( factor_matrices[0].shape[1], scale ), factor_matrices )
+
+    @property
+    def ndim( self ):
+        return len( self.factors )
+
+    @property
+    def rank( self ):
+        return self.weights.shape[0]
+
+    def value( self, index ):
+        """
+        :param index: tuple with one index per mode
+        :return : the entry of the model at index
+        """
+        row = self.weights
+        for f, i in zip( self.factors, index ):
+            row = row * f[i]
+        return float( row.sum() )
+
+    def values( self, indices ):
+        """
+        vectorized point queries: one gather of B rows per mode, then one product
+        :param indices: integer array of shape (B, N), one index tuple per row
+        :return : vector of the B entries
+        """
+        xp = bk.get_backend()
+        indices = xp.asarray( indices )
+        rows = self.factors[0][ indices[:, 0] ]
+        for n in range( 1 , self.ndim ):
+            rows = rows * self.factors[n][ indices[:, n] ]
+        return rows @ self.weights
+
+    def block( self, index ):
+        """
+        reconstruct a sub-block from the selected factor rows only
+        :param index: tuple of one slice, index array or integer per mode; missing trailing modes
+            are taken whole and integers drop their mode, as in numpy basic indexing
+        :return : dense sub-block
+        """
+        xp = bk.get_backend()
+        index = tuple( index ) + ( slice( None ), ) * ( self.ndim - len( index ) )
+        rows = [ xp.reshape( f[i], ( -1, self.rank ) ) for f, i in zip( self.factors, index ) ]
+        out_shape = tuple( r.shape[0] for r, i in zip( rows, index )
+                if isinstance( i, slice ) or xp.ndim( i ) > 0 )
+#       outer product over all modes but the last, weighted, then one GEMM with the last
+        t_r = rows[0] * self.weights
+        for r in rows[1:-1]:
+            t_r = xp.reshape( t_r[:, None, :] * r[None, :, :], ( -1, self.rank ) )
+        if len( rows ) > 1:
+            t_r = t_r @ xp.transpose( rows[-1] )
+        else:
+            t_r = t_r.sum( axis=1 )
+        return xp.reshape( t_r, out_shape )
+
+    def full( self ):
+        """
+        :return : the whole tensor, equal to cp_proto.recomp
+        """
+        return self.block( () )
+
+    def inner( self, other ):
+        """
+        inner product of two models of the same shape in O(N I R R') factor-space work
+        :param other: CPModel
+        :return : sum of the elementwise product of the two tensors
+        """
+        xp = bk.get_backend()
+        if other.shape != self.shape:
+            raise ValueError( 'shape mismatch: ' + str( self.shape ) + ' and ' + str( other.shape ) )
+        v = xp.ones( ( self.rank, other.rank ) )
+        for a, b in zip( self.factors, other.factors ):
+            v = v * ( xp.transpose( a ) @ b )
+        return float( self.weights @ v @ other.weights )
+
+    def norm( self ):
+        """
+        :return : frobenius norm of the model
+        """
+        return max( self.inner( self ), 0 ) ** 0.5
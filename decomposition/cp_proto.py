@@ -1,5 +1,6 @@
 import lin_alg_proto as la
-import numpy as np
+import dimtree_proto as dt
+import backend as bk
 
 def fr_norm_tensor( tensor, approx_tensor ):
     """
@@ -8,7 +9,54 @@ def fr_norm_tensor( tensor, approx_tensor ):
     :param approx_tensor: item 2
     :return : frobenius norm of the difference of the two
     """
-    return np.linalg.norm( tensor - approx_tensor )
+    return bk.get_backend().linalg.norm( tensor - approx_tensor )
+
+def unfold( tensor, n ):
+    """
+    mode-n matricization of a tensor. Mode n becomes the rows and the remaining
+    modes are flattened, in increasing order with the last varying fastest, into the columns
+    :param tensor: input tensor
+    :param n: mode to unfold along
+    :return : matrix of shape (shape[n], total_elements / shape[n])
+    """
+    xp = bk.get_backend()
+    return xp.reshape( xp.moveaxis( tensor, n, 0 ), ( tensor.shape[n], -1 ) )
+
+def mttkrp( tensor, factor_matrices, n ):
+    """
+    matricized tensor times Khatri-Rao product, the core kernel of a CP-ALS update.
+    The Khatri-Rao product of all factors but n is taken in increasing mode order
+    so its rows line up with the columns of unfold( tensor, n )
+    :param tensor: input tensor
+    :param factor_matrices: list of factor matrices, one per mode
+    :param n: mode being updated
+    :return : matrix of shape (shape[n], num_components)
+    """
+    k_temp = None
+    for i in [x for x in range( 0 , len( factor_matrices ) ) if x != n]:
+        if k_temp is None:
+            k_temp = factor_matrices[i]
+        else:
+            k_temp = la.khatri_rao( k_temp , factor_matrices[i] )
+    return unfold( tensor , n ) @ k_temp
+
+def gram( factor_matrices, n ):
+    """
+    Hadamard product of the Gram matrices of all factors but n, i.e. the normal
+    equation matrix of the mode-n least squares problem in CP-ALS
+    :param factor_matrices: list of factor matrices, one per mode
+    :param n: mode being updated
+    :return : (num_components x num_components) matrix
+    """
+    xp = bk.get_backend()
+    num_components = factor_matrices[0].shape[1]
+    v = xp.ones( (num_components, num_components) )
+    for i in [x for x in range( 0 , len( factor_matrices ) ) if x != n]:
+        v = la.hadamard(
+                v ,
+                xp.transpose( factor_matrices[i] ) @ factor_matrices[i]
+                )
+    return v
 
 def recomp( factor_matrices, lambdas, orig_shape ):
     """
@@ -16,72 +64,122 @@ def recomp( factor_matrices, lambdas, orig_shape ):
     :param factor_matrices: list of factor matrices
     """
 #   Each factor matrix has exactly r column vectors, where r is the number of unique rank one components
-    num_components = len( factor_matrices[0] )
+    xp = bk.get_backend()
+    num_components = factor_matrices[0].shape[1]
     num_factors = len( factor_matrices )
-    t_r = np.zeros( orig_shape )
+    t_r = xp.zeros( orig_shape )
     for i in range( 0 , num_components ):
         cur = lambdas[0] * factor_matrices[0][ : , i ]
         for j in range( 1 , num_factors ):
-            cur = np.multiply.outer( cur , lambdas[j] * factor_matrices[j][ : , i ] )
+            cur = xp.multiply.outer( cur , lambdas[j] * factor_matrices[j][ : , i ] )
         t_r = t_r + cur
     return t_r
 
 
-def cp_decomp( tensor, num_factors, epochs, threshold ):
+def cp_decomp( tensor, num_factors, epochs, threshold, random_state=None, cache_bytes=None ):
     """
-    function to carry out a CP decomposition for a given tensor
+    function to carry out a CP decomposition for a given tensor with alternating least squares.
+    The mttkrp of every sweep goes through a dimension tree (see dimtree_proto), which
+    reuses partial contractions between neighbouring modes, and the fit is tracked in
+    factor space, so the full tensor is never recomposed during the iterations
     :param tensor: input tensor to carry out decomposition for
     :param num_factors: number of rank-one factors to fit for
     :param epochs: maximum number iterations
-    :param threshold: maximum acceptable error
-    :return : error rate, weight vector, factor matrices
+    :param threshold: maximum acceptable error (frobenius norm of the residual)
+    :param random_state: seed for the random initialization
+    :param cache_bytes: memory allowed for cached partial mttkrps, None for no limit
+    :return : weight vector (one scale per mode), factor matrices with unit frobenius norm
     """
+    xp = bk.get_backend()
     shape = tensor.shape
     N = len( shape )
-    factor_matrices = [None] * N
-    total_elements = 1
-#   total number of scalar elements in tensor
-    for i in range(0, N):
-        total_elements *= shape[i]
 #   initialize factors to random values
-    for i in range( 0 , N ):
-        factor_matrices[i] = np.full( (shape[i],num_factors), 1 )
+    rng = xp.random.RandomState( random_state )
+    factor_matrices = [ rng.random_sample( (shape[i], num_factors) ) for i in range( 0 , N ) ]
+    tree = dt.DimensionTree( tensor , factor_matrices , cache_bytes )
+    norm_x = float( xp.linalg.norm( tensor ) )
     ep_passed = 0
-    lambdas = np.zeros( num_factors )
     while True:
-        for n in range( 0 , N - 1 ):
-            v = np.full( (num_factors, num_factors) , 1 )
-            for i in [x for x in range( 0 , N ) if x != n]:
-                v = la.hadamard(
-                        v ,
-                        np.transpose( factor_matrices[i] ) @ factor_matrices[i]
-                        )
-            v_inv = np.linalg.pinv( v )
-            k_temp = np.full( (1) , 1 )
-            for i in [x for x in range( N - 1 , -1 , -1 ) if x != n]:
-                k_temp = la.khatri_rao( k_temp , factor_matrices[i] )
-            factor_matrices[n] = np.reshape( 
-                    np.copy(tensor) , 
-                    (shape[n], int (total_elements / shape[n])) ) @ k_temp @ v_inv
-            lambdas[n] = np.linalg.norm( factor_matrices[n] )
-            factor_matrices[n] = ( 1 / lambdas[n] ) * factor_matrices[n]
-        est = recomp( factor_matrices , lambdas , shape )
-        cost = fr_norm_tensor( tensor, est )
+        for n in range( 0 , N ):
+            m = tree.mttkrp( n )
+            v = gram( factor_matrices , n )
+            tree.update( n , m @ xp.linalg.pinv( v ) )
+#       residual norm from the last mode's mttkrp and gram, both still valid here
+        a = factor_matrices[N - 1]
+        inner = float( xp.sum( m * a ) )
+        model_sq = float( xp.sum( v * ( xp.transpose( a ) @ a ) ) )
+        cost = max( norm_x ** 2 - 2 * inner + model_sq, 0 ) ** 0.5
         ep_passed += 1
         if not cost > threshold or not ep_passed < epochs:
             break
+    lambdas = xp.zeros( N )
+    for n in range( 0 , N ):
+        lambdas[n] = xp.linalg.norm( factor_matrices[n] )
+        factor_matrices[n] = ( 1 / lambdas[n] ) * factor_matrices[n]
     return lambdas, factor_matrices
 
 
-                        
+def ncp_hals( tensor, num_factors, epochs, threshold, tol=1e-8, random_state=None, cache_bytes=None ):
+    """
+    function to carry out a nonnegative CP decomposition with hierarchical ALS.
+    Each mode update takes one mttkrp (from the dimension tree) and one gram and then updates the
+    factor matrix one column at a time in closed form, every column update being a
+    whole-vector operation. The fit is tracked in factor space, so the full tensor
+    is never recomposed during the iterations
+    :param tensor: nonnegative input tensor to carry out decomposition for
+    :param num_factors: number of rank-one factors to fit for
+    :param epochs: maximum number iterations
+    :param threshold: maximum acceptable error (frobenius norm of the residual)
+    :param tol: stop once the relative error improves by less than tol in an epoch
+    :param random_state: seed for the nonnegative random initialization
+    :param cache_bytes: memory allowed for cached partial mttkrps, None for no limit
+    :return : weight vector (one scale per mode, as in cp_decomp), factor matrices
+    """
+    xp = bk.get_backend()
+    shape = tensor.shape
+    N = len( shape )
+    rng = xp.random.RandomState( random_state )
+    factor_matrices = [ rng.random_sample( (shape[i], num_factors) ) for i in range( 0 , N ) ]
+    tree = dt.DimensionTree( tensor , factor_matrices , cache_bytes )
+    norm_x = float( xp.linalg.norm( tensor ) )
+    eps = xp.finfo( factor_matrices[0].dtype ).eps
+    prev_error = None
+    ep_passed = 0
+    while True:
+        for n in range( 0 , N ):
+            m = tree.mttkrp( n )
+            v = gram( factor_matrices , n )
+            a = factor_matrices[n]
+            for r in range( 0 , num_factors ):
+                a[ : , r ] = xp.maximum(
+                        a[ : , r ] + ( m[ : , r ] - a @ v[ : , r ] ) / max( float( v[ r , r ] ), eps ),
+                        eps )
+            tree.update( n , a )
+#       residual norm from the last mode's mttkrp and gram, both still valid here
+        inner = float( xp.sum( m * a ) )
+        model_sq = float( xp.sum( v * ( xp.transpose( a ) @ a ) ) )
+        error = max( norm_x ** 2 - 2 * inner + model_sq, 0 ) ** 0.5
+        ep_passed += 1
+        if not error > threshold or not ep_passed < epochs:
+            break
+        if prev_error is not None and abs( prev_error - error ) <= tol * max( norm_x, eps ):
+            break
+        prev_error = error
+    lambdas = xp.zeros( N )
+    for n in range( 0 , N ):
+        lambdas[n] = xp.linalg.norm( factor_matrices[n] )
+        factor_matrices[n] = ( 1 / lambdas[n] ) * factor_matrices[n]
+    return lambdas, factor_matrices
 
 
 
-t = recomp([np.array([[1,0,0],[0,1,0],[0,0,1]]),
-    np.array([[1,0,0],[0,1,0],[0,0,1]]),
-    np.array([[1,0,0],[0,1,0],[0,0,1]])],
-    [5,5,5],
-    (3,3,3))
-print(t)
-c = cp_decomp(t, 3, 1000, 0)
-print( recomp( c[1], c[0], t.shape))
+if __name__ == '__main__':
+    xp = bk.get_backend()
+    t = recomp([xp.array([[1,0,0],[0,1,0],[0,0,1]]),
+        xp.array([[1,0,0],[0,1,0],[0,0,1]]),
+        xp.array([[1,0,0],[0,1,0],[0,0,1]])],
+        [5,5,5],
+        (3,3,3))
+    print(t)
+    c = cp_decomp(t, 3, 1000, 0)
+    print( recomp( c[1], c[0], t.shape))
@@ -0,0 +1,96 @@
+'''
+This is a prototype module that defines a dimension tree scheduler for MTTKRP.
+During one ALS sweep the MTTKRP of neighbouring modes share most of their work:
+both contract the tensor with the factors of the modes far away from them. The
+tree splits the modes into contiguous halves recursively; every node caches the
+partial MTTKRP of its modes, i.e. the tensor contracted with the factors of all
+modes outside the node, and children are computed from their parent instead of
+from the tensor. Only the two children of the root touch the full tensor, with
+one GEMM each. A factor update invalidates exactly the nodes that do not contain
+its mode.
+'''
+import math
+import lin_alg_proto as la
+import backend as bk
+
+
+class DimensionTree:
+    """
+    MTTKRP cache for one tensor and a list of factor matrices that is updated in place.
+    Nodes are half-open mode ranges (lo, hi); the partial tensor of a node has
+    shape (I_lo x ... x I_hi-1 x num_components).
+    """
+
+    def __init__( self, tensor, factor_matrices, max_cache_bytes=None ):
+        """
+        :param tensor: input tensor, at least 2 modes
+        :param factor_matrices: list of factor matrices, one per mode
+        :param max_cache_bytes: memory allowed for cached partials, None for no limit;
+            nodes that do not fit are recomputed from their parent whenever needed
+        """
+        self.tensor = tensor
+        self.factor_matrices = factor_matrices
+        self.N = len( tensor.shape )
+        self.max_cache_bytes = max_cache_bytes
+        self.cached_bytes = 0
+        self._cache = {}
+
+    def update( self, n, factor ):
+        """
+        Replace factor n and drop every cached partial that was contracted with it.
+        :param n: mode of the factor
+        :param factor: new factor matrix
+        """
+        self.factor_matrices[n] = factor
+        for node in [x for x in self._cache if not x[0] <= n < x[1]]:
+            self.cached_bytes -= self._cache.pop( node ).nbytes
+
+    def mttkrp( self, n ):
+        """
+        :param n: mode being updated
+        :return : matrix of shape (shape[n], num_components), equal to cp_proto.mttkrp
+        """
+        return self._partial( ( n, n + 1 ) )
+
+    def _khatri_rao( self, lo, hi ):
+        k_temp = self.factor_matrices[lo]
+        for i in range( lo + 1 , hi ):
+            k_temp = la.khatri_rao( k_temp , self.factor_matrices[i] )
+        return k_temp
+
+    def _parent( self, node ):
+        lo, hi = 0, self.N
+        while True:
+            mid = ( lo + hi ) // 2
+            child = ( lo, mid ) if node[1] <= mid else ( mid, hi )
+            if child == node:
+                return ( lo, hi )
+            lo, hi = child
+
+    def _partial( self, node ):
+        if node in self._cache:
+            return self._cache[node]
+        xp = bk.get_backend()
+        shape = self.tensor.shape
+        lo, hi = self._parent( node )
+        mid = ( lo + hi ) // 2
+        if ( lo, hi ) == ( 0, self.N ):
+#           root children: one GEMM on the tensor, reshaped (not copied) to left x right
+            x = xp.reshape( self.tensor, ( -1, math.prod( shape[mid:] ) ) )
+            if node[0] == lo:
+                t_r = x @ self._khatri_rao( mid , hi )
+            else:
+                t_r = xp.transpose( x ) @ self._khatri_rao( lo , mid )
+        else:
+            parent = self._partial( ( lo, hi ) )
+            rank = parent.shape[-1]
+            p = xp.reshape( parent, ( math.prod( shape[lo:mid] ), -1, rank ) )
+            if node[0] == lo:
+                t_r = xp.einsum( 'ijr,jr->ir', p, self._khatri_rao( mid , hi ) )
+            else:
+                t_r = xp.einsum( 'ijr,ir->jr', p, self._khatri_rao( lo , mid ) )
+        t_r = xp.reshape( t_r, tuple( shape[node[0]:node[1]] ) + ( t_r.shape[-1], ) )
+        if self.max_cache_bytes is None or self.cached_bytes + t_r.nbytes <= self.max_cache_bytes:
+            self._cache[node] = t_r
+            self.cached_bytes += t_r.nbytes
+        return t_r
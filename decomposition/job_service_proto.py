@@ -0,0 +1,261 @@
+'''
+This is a prototype module that defines a local service for running many decomposition
+jobs from one process.
+Jobs are submitted through an asyncio front end (submit / status / cancel / result)
+and run in a bounded pool of spawned worker processes. When a job gets a worker slot
+its tensor is copied once into multiprocessing.shared_memory, and the worker maps it
+instead of receiving a pickled copy; the block is unlinked when the job ends, so only
+running jobs hold one. A job is identified by a content hash of its tensor, method and
+parameters. Hashing and copying run in threads and do not block the event loop. Submitting a job that is already
+queued or running returns the same id. Submitting one that finished recently is
+answered from an LRU result cache. Queue depth, hit counts and latencies are kept
+for metrics().
+'''
+import os
+import time
+import json
+import asyncio
+import hashlib
+import collections
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import cp_proto as cp
+import tt_proto as tt
+import parallel_cp_proto as pcp
+
+METHODS = {
+    'cp_decomp': cp.cp_decomp,
+    'ncp_hals': cp.ncp_hals,
+    'tt_svd': tt.tt_svd,
+}
+LATENCY_WINDOW = 1000
+
+
+def job_key( tensor, method, params ):
+    """
+    :param tensor: input tensor
+    :param method: name in METHODS
+    :param params: keyword arguments of the method
+    :return : hex digest identifying the job
+    """
+    h = hashlib.blake2b( digest_size=16 )
+    h.update( json.dumps( [ method, tensor.dtype.str, list( tensor.shape ), params ],
+            sort_keys=True, default=str ).encode() )
+    h.update( np.ascontiguousarray( tensor ) )
+    return h.hexdigest()
+
+def _to_shared( tensor ):
+    """
+    :param tensor: input tensor
+    :return : new SharedMemory block holding a copy of tensor
+    """
+    shm = shared_memory.SharedMemory( create=True, size=max( tensor.nbytes, 1 ) )
+    np.ndarray( tensor.shape, dtype=tensor.dtype, buffer=shm.buf )[...] = tensor
+    return shm
+
+def _run_job( shm_name, shape, dtype, method, params ):
+    """
+    Worker side: map the input tensor from shared memory and run the method on it.
+    """
+    shm = shared_memory.SharedMemory( name=shm_name )
+    try:
+        tensor = np.ndarray( shape, dtype=dtype, buffer=shm.buf )
+        result = METHODS[method]( tensor, **params )
+        del tensor
+        return result
+    finally:
+        shm.close()
+
+
+class Job:
+    """
+    Book-keeping for one submitted job. status is queued, running, done, failed or cancelled.
+    """
+
+    __slots__ = ( 'key', 'status', 'result', 'error', 'task', 'tensor', 'shm', 'submitted', 'started', 'finished' )
+
+    def __init__( self, key, tensor ):
+        self.key = key
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.task = None
+#       the caller's tensor until dispatch, then the shared memory copy the worker maps
+        self.tensor = tensor
+        self.shm = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+
+
+class JobService:
+    """
+    Asyncio front end over a process pool. Create and use it inside a running event loop,
+    preferably as 'async with JobService() as service:'.
+    """
+
+    def __init__( self, max_workers=None, cache_size=128, threads_per_worker=1 ):
+        """
+        :param max_workers: worker processes, also the number of jobs running at once;
+            defaults to the cpu count
+        :param cache_size: number of finished jobs whose results are kept for deduplication
+        :param threads_per_worker: BLAS threads allowed in each worker
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.threads_per_worker = threads_per_worker
+        self._pool = ProcessPoolExecutor( self.max_workers, mp_context=mp.get_context( 'spawn' ) )
+        self._slots = asyncio.Semaphore( self.max_workers )
+        self._active = {}
+        self._finished = collections.OrderedDict()
+        self._counts = collections.Counter()
+        self._waits = collections.deque( maxlen=LATENCY_WINDOW )
+        self._latencies = collections.deque( maxlen=LATENCY_WINDOW )
+
+    async def __aenter__( self ):
+        return self
+
+    async def __aexit__( self, *exc ):
+        await self.close()
+
+    def _job( self, job_id ):
+        job = self._active.get( job_id ) or self._finished.get( job_id )
+        if job is None:
+            raise KeyError( 'unknown job ' + repr( job_id ) )
+        return job
+
+    async def submit( self, tensor, method='cp_decomp', **params ):
+        """
+        :param tensor: input tensor (host memory), not copied before the job is dispatched,
+            so it must not be modified while the job is queued
+        :param method: cp_decomp, ncp_hals or tt_svd
+        :param params: keyword arguments of the method, e.g. num_factors, epochs, threshold
+        :return : job id
+        """
+        if method not in METHODS:
+            raise ValueError( 'unknown method ' + repr( method ) + ', use one of ' + str( list( METHODS ) ) )
+        tensor = np.asarray( tensor )
+        key = await asyncio.get_running_loop().run_in_executor( None, job_key, tensor, method, params )
+        self._counts['submitted'] += 1
+        if key in self._active:
+            self._counts['dedup_hits'] += 1
+            return key
+        if key in self._finished and self._finished[key].status == 'done':
+            self._counts['cache_hits'] += 1
+            self._finished.move_to_end( key )
+            return key
+        self._finished.pop( key, None )
+        job = Job( key, tensor )
+        self._active[key] = job
+        job.task = asyncio.ensure_future( self._execute( job, method, params ) )
+        job.task.add_done_callback( lambda task: self._finish( job, task ) )
+        return key
+
+    async def _execute( self, job, method, params ):
+        async with self._slots:
+#           running from here on, so cancel() cannot interrupt the copy and leak the block
+            job.status = 'running'
+            job.started = time.perf_counter()
+            tensor = job.tensor
+            job.shm = await asyncio.get_running_loop().run_in_executor( None, _to_shared, tensor )
+            job.tensor = None
+#           spawn copies the environment, so workers started by this submit get the BLAS limit
+            saved_env = { k: os.environ.get( k ) for k in pcp._BLAS_THREAD_VARS }
+            for k in pcp._BLAS_THREAD_VARS:
+                os.environ[k] = str( self.threads_per_worker )
+            try:
+                future = self._pool.submit( _run_job, job.shm.name, tensor.shape, tensor.dtype.str, method, params )
+            finally:
+                pcp._restore_env( saved_env )
+            return await asyncio.wrap_future( future )
+
+    def _finish( self, job, task ):
+        """
+        done callback of the job task, also runs for tasks cancelled before they started
+        """
+        job.finished = time.perf_counter()
+        if task.cancelled():
+            job.status = 'cancelled'
+        elif task.exception() is not None:
+            job.error = task.exception()
+            job.status = 'failed'
+        else:
+            job.result = task.result()
+            job.status = 'done'
+        job.tensor = None
+        if job.shm is not None:
+            job.shm.close()
+            job.shm.unlink()
+            job.shm = None
+        self._counts[job.status] += 1
+        if job.started is not None:
+            self._waits.append( job.started - job.submitted )
+            self._latencies.append( job.finished - job.submitted )
+        del self._active[job.key]
+        self._finished[job.key] = job
+        while len( self._finished ) > self.cache_size:
+            self._finished.popitem( last=False )
+
+    def status( self, job_id ):
+        """
+        :param job_id: id returned by submit
+        :return : queued, running, done, failed or cancelled
+        """
+        return self._job( job_id ).status
+
+    def cancel( self, job_id ):
+        """
+        cancel a queued job. Running jobs cannot be interrupted inside the worker
+        :param job_id: id returned by submit
+        :return : True if the job was queued and is now cancelled
+        """
+        job = self._job( job_id )
+        if job.status != 'queued':
+            return False
+        job.status = 'cancelled'
+        job.task.cancel()
+        return True
+
+    async def result( self, job_id, timeout=None ):
+        """
+        wait for a job and return what its method returned. A timeout or a cancelled wait leaves
+        the job running; a failed job raises its exception and a cancelled one CancelledError
+        :param job_id: id returned by submit
+        :param timeout: seconds to wait, None for no limit
+        :return : result of the method
+        """
+        job = self._job( job_id )
+        done, pending = await asyncio.wait( [ job.task ], timeout=timeout )
+        if pending:
+            raise asyncio.TimeoutError( 'job ' + job_id + ' still ' + job.status )
+        return job.task.result()
+
+    def metrics( self ):
+        """
+        :return : dict with the queue depth, running jobs, counters, and mean / p50 / p95 of the
+            queue wait and the submit-to-finish latency in seconds over the last LATENCY_WINDOW jobs
+        """
+        statuses = collections.Counter( job.status for job in self._active.values() )
+        out = { 'queue_depth': statuses['queued'], 'running': statuses['running'] }
+        for name in [ 'submitted', 'dedup_hits', 'cache_hits', 'done', 'failed', 'cancelled' ]:
+            out[name] = self._counts[name]
+        for name, values in [ ( 'wait', self._waits ), ( 'latency', self._latencies ) ]:
+            values = np.array( values ) if values else np.zeros( 1 )
+            out[name + '_mean'] = float( values.mean() )
+            out[name + '_p50'] = float( np.percentile( values, 50 ) )
+            out[name + '_p95'] = float( np.percentile( values, 95 ) )
+        return out
+
+    async def close( self ):
+        """
+        cancel queued jobs, wait for running ones and shut the pool down
+        """
+        tasks = [ job.task for job in self._active.values() ]
+        for job in list( self._active.values() ):
+            if job.status == 'queued':
+                job.task.cancel()
+        if tasks:
+            await asyncio.wait( tasks )
+        self._pool.shutdown( wait=True )
@@ -1,9 +1,11 @@
 '''
 This is a prototype module that defines static methods useful in tensor decomposition.
 Defined in this class are the kronecker, khatri-rao, and hadamard products.
+All array operations dispatch through the active backend (see backend.py),
 numpy is the only required package.
 '''
-import numpy as np
+import math
+import backend as bk
 
 
 def hadamard( m1, m2 ):       
@@ -16,7 +18,7 @@ def hadamard( m1, m2 ):
 
     :return : resultant matrix of the same size
     """
-    return np.multiply( m1, m2 )
+    return bk.get_backend().multiply( m1, m2 )
 
 def kronecker( m1, m2 ):
     """
@@ -27,9 +29,10 @@ def kronecker( m1, m2 ):
     :param m2: input matrix 2 (p x q)
     :return : block matrix from executing kronecker product (mp x nq)
     """
+    xp = bk.get_backend()
     s1 = m1.shape
     s2 = m2.shape
-    m_r = np.empty( (s1[0] * s2[0] , s1[1] * s2[1]) )           # np.empty faster than np.zeros
+    m_r = xp.empty( (s1[0] * s2[0] , s1[1] * s2[1]) )           # np.empty faster than np.zeros
     for r in range( 0 , s1[0] ):
         for c in range( 0 , s1[1] ):
             m_r[ s2[0] * r : s2[0] * (r+1) , s2[1] * c : s2[1] * (c+1) ] = m1[ r , c ] * m2
@@ -48,9 +51,273 @@ def khatri_rao( m1, m2 ):
     s2 = m2.shape
     if len(s1) == 1:
         return m1 * m2
-    m_r = np.empty( (s1[0] * s2[0] , s1[1]) )
+    m_r = bk.get_backend().empty( (s1[0] * s2[0] , s1[1]) )
     for c in range( 0 , s1[1]):
         for r in range( 0 , s1[0]):
             m_r[ s2[0] * r : s2[0] * (r+1) , c ] = m1[ r , c ] * m2[ : , c ]
     return m_r
 
+
+def mode_n_product( tensor, matrix, n ):
+    """
+    The n-mode product (tensor times matrix, TTM) multiplies every mode-n fiber
+    of the tensor by the matrix. If the tensor is (I_0 x ... x I_n x ... x I_N-1)
+    and the matrix is (J x I_n), the result is (I_0 x ... x J x ... x I_N-1).
+    The contraction goes through tensordot on the original array, and the new
+    mode is moved back into place as a view, so there is no explicit
+    unfold / fold round trip.
+    :param tensor: input tensor
+    :param matrix: input matrix (J x I_n)
+    :param n: mode to multiply along
+    :return : tensor with mode n replaced by J
+    """
+    xp = bk.get_backend()
+    return xp.moveaxis( xp.tensordot( tensor, matrix, axes=( [n], [1] ) ), -1, n )
+
+def _ttm_order( matrices ):
+    """
+    Order in which a chain of n-mode products does the least work. Applying mode a
+    before mode b is cheaper iff J_a (1 - r_b) <= J_b (1 - r_a), with r = J / I the
+    size ratio of each product. That gives: shrinking modes first, then size
+    preserving, then growing ones, each group sorted by J / (1 - r).
+    """
+    def key( i ):
+        rows, cols = matrices[i].shape
+        r = rows / cols
+        if r == 1:
+            return ( 1, 0 )
+        return ( 0 if r < 1 else 2, rows / ( 1 - r ) )
+    return sorted( range( 0 , len( matrices ) ), key=key )
+
+def multi_mode_product( tensor, matrices, modes=None, skip=None, transpose=False ):
+    """
+    Chained n-mode product, tensor x_m0 M_0 x_m1 M_1 ... The products commute for
+    distinct modes, so they are applied in the order that keeps the intermediate
+    tensors smallest (see _ttm_order) instead of the order given.
+    :param tensor: input tensor
+    :param matrices: list of matrices, matrix i is (J_i x I_modes[i])
+    :param modes: list of modes, defaults to 0 .. len(matrices) - 1
+    :param skip: a mode to leave out, as in the all-but-one products of Tucker / HOOI
+    :param transpose: multiply by the transpose of every matrix instead
+    :return : resultant tensor
+    """
+    xp = bk.get_backend()
+    if modes is None:
+        modes = list( range( 0 , len( matrices ) ) )
+    pairs = [ ( m, xp.transpose( a ) if transpose else a ) for m, a in zip( modes, matrices ) if m != skip ]
+    t_r = tensor
+    for i in _ttm_order( [ a for m, a in pairs ] ):
+        t_r = mode_n_product( t_r , pairs[i][1] , pairs[i][0] )
+    return t_r
+
+def batched_mode_n_product( tensors, matrix, n ):
+    """
+    n-mode product applied to a batch of tensors stacked along axis 0.
+    The matrix is either shared (J x I_n) or given per tensor (B x J x I_n).
+    :param tensors: batch of tensors (B x I_0 x ... x I_N-1)
+    :param matrix: input matrix (J x I_n) or batch of matrices (B x J x I_n)
+    :param n: mode of each tensor to multiply along (not counting the batch axis)
+    :return : batch of tensors with mode n replaced by J
+    """
+    xp = bk.get_backend()
+    if matrix.ndim == 2:
+        return mode_n_product( tensors , matrix , n + 1 )
+#   one (J x I_n) @ (I_n x rest) product per batch entry, done as a single batched matmul
+    moved = xp.moveaxis( tensors, n + 1, 1 )
+    t_r = xp.matmul( matrix, xp.reshape( moved, ( moved.shape[0], moved.shape[1], -1 ) ) )
+    return xp.moveaxis( xp.reshape( t_r, ( moved.shape[0], matrix.shape[1] ) + moved.shape[2:] ), 1, n + 1 )
+
+
+class _LazyOperator:
+    """
+    Common interface of the lazy product operators below. Subclasses hold only their
+    factor matrices and implement matmat, rmatmat (product with the transpose), rows
+    and columns; everything else is derived from those.
+    """
+
+    def matvec( self, x ):
+        """
+        :param x: vector of length shape[1]
+        :return : operator times x, length shape[0]
+        """
+        return self.matmat( x[ : , None ] )[ : , 0 ]
+
+    def rmatvec( self, y ):
+        """
+        :param y: vector of length shape[0]
+        :return : transpose of the operator times y, length shape[1]
+        """
+        return self.rmatmat( y[ : , None ] )[ : , 0 ]
+
+    def row( self, i ):
+        return self.rows( [ i ] )[0]
+
+    def column( self, j ):
+        return self.columns( [ j ] )[0]
+
+    @property
+    def T( self ):
+        return _TransposedOperator( self )
+
+    def __matmul__( self, x ):
+        return self.matvec( x ) if x.ndim == 1 else self.matmat( x )
+
+    def _split( self, index, sizes ):
+        xp = bk.get_backend()
+        return xp.unravel_index( xp.asarray( index ), sizes )
+
+
+class _TransposedOperator( _LazyOperator ):
+
+    def __init__( self, op ):
+        self.op = op
+        self.shape = ( op.shape[1], op.shape[0] )
+
+    def matmat( self, x ):
+        return self.op.rmatmat( x )
+
+    def rmatmat( self, y ):
+        return self.op.matmat( y )
+
+    def rows( self, index ):
+        return self.op.columns( index )
+
+    def columns( self, index ):
+        return self.op.rows( index )
+
+    def todense( self ):
+        return bk.get_backend().transpose( self.op.todense() )
+
+    @property
+    def T( self ):
+        return self.op
+
+
+class KroneckerOperator( _LazyOperator ):
+    """
+    Lazy Kronecker product A_0 x A_1 x ... of matrices, laid out exactly like kronecker( A_0, A_1 ).
+    Products go through the mixed-product identity (A x B) vec(X) = vec(A X B^T), done as
+    n-mode products on the reshaped input, so no block matrix is ever formed and the cost
+    scales with the factor sizes.
+    """
+
+    def __init__( self, *factors ):
+        """
+        :param factors: two or more matrices (m_i x n_i)
+        """
+        self.factors = list( factors )
+        self.row_sizes = tuple( f.shape[0] for f in self.factors )
+        self.col_sizes = tuple( f.shape[1] for f in self.factors )
+        self.shape = ( math.prod( self.row_sizes ), math.prod( self.col_sizes ) )
+
+    def matmat( self, x ):
+        """
+        :param x: matrix (shape[1] x k)
+        :return : operator times x (shape[0] x k)
+        """
+        xp = bk.get_backend()
+        k = x.shape[1]
+        t = xp.reshape( x, self.col_sizes + ( k, ) )
+        t = multi_mode_product( t , self.factors , list( range( 0 , len( self.factors ) ) ) )
+        return xp.reshape( t, ( self.shape[0], k ) )
+
+    def rmatmat( self, y ):
+        return self.T.matmat( y )
+
+    @property
+    def T( self ):
+        xp = bk.get_backend()
+        return KroneckerOperator( *[ xp.transpose( f ) for f in self.factors ] )
+
+    def rows( self, index ):
+        """
+        :param index: sequence of row indices
+        :return : matrix (len(index) x shape[1]) holding those rows
+        """
+        xp = bk.get_backend()
+        idx = self._split( index, self.row_sizes )
+        m_r = self.factors[0][ idx[0] ]
+        for f, i in zip( self.factors[1:], idx[1:] ):
+            m_r = xp.reshape( m_r[ : , : , None ] * f[ i ][ : , None , : ], ( m_r.shape[0], -1 ) )
+        return m_r
+
+    def columns( self, index ):
+        return self.T.rows( index )
+
+    def todense( self ):
+        m_r = self.factors[0]
+        for f in self.factors[1:]:
+            m_r = kronecker( m_r , f )
+        return m_r
+
+
+class KhatriRaoOperator( _LazyOperator ):
+    """
+    Lazy Khatri-Rao product A_0 . A_1 . ... of matrices with R columns each, laid out
+    exactly like khatri_rao( A_0, A_1 ). Products contract one factor at a time with
+    the shared column index kept as a batch axis, so the (prod m_i x R) matrix is never
+    formed; the largest temporary is (prod of all but one m_i) x k x R.
+    """
+
+    def __init__( self, *factors ):
+        """
+        :param factors: two or more matrices (m_i x R)
+        """
+        self.factors = list( factors )
+        self.row_sizes = tuple( f.shape[0] for f in self.factors )
+        self.shape = ( math.prod( self.row_sizes ), self.factors[0].shape[1] )
+
+    def matmat( self, x ):
+        """
+        :param x: matrix (R x k)
+        :return : operator times x (shape[0] x k)
+        """
+        xp = bk.get_backend()
+        k = x.shape[1]
+#       t[i_0, .., i_j, k, c] = x[c, k] * A_0[i_0, c] * .. * A_j[i_j, c], the last factor contracts c
+        t = self.factors[0][ : , None , : ] * xp.transpose( x )[ None , : , : ]
+        for f in self.factors[1:-1]:
+            t = xp.reshape( t[ : , None , : , : ] * f[ None , : , None , : ], ( -1, k, self.shape[1] ) )
+        t = xp.matmul( t, xp.transpose( self.factors[-1] ) )
+        return xp.reshape( xp.swapaxes( t, 1, 2 ), ( self.shape[0], k ) )
+
+    def rmatmat( self, y ):
+        """
+        :param y: matrix (shape[0] x k)
+        :return : transpose of the operator times y (R x k)
+        """
+        xp = bk.get_backend()
+        k = y.shape[1]
+#       contract the last factor first, then the others with the column index as a batch axis
+        t = xp.tensordot( xp.reshape( y, ( -1, self.row_sizes[-1], k ) ), self.factors[-1], axes=( [1], [0] ) )
+        for f in self.factors[-2:0:-1]:
+            t = xp.einsum( 'aikc,ic->akc', xp.reshape( t, ( -1, f.shape[0], k, self.shape[1] ) ), f )
+        return xp.transpose( xp.einsum( 'ikc,ic->kc', t, self.factors[0] ) )
+
+    def rows( self, index ):
+        """
+        :param index: sequence of row indices
+        :return : matrix (len(index) x R) holding those rows
+        """
+        idx = self._split( index, self.row_sizes )
+        m_r = self.factors[0][ idx[0] ]
+        for f, i in zip( self.factors[1:], idx[1:] ):
+            m_r = m_r * f[ i ]
+        return m_r
+
+    def columns( self, index ):
+        """
+        :param index: sequence of column indices
+        :return : matrix (len(index) x shape[0]) holding those columns as rows
+        """
+        xp = bk.get_backend()
+        m_r = xp.transpose( self.factors[0][ : , index ] )
+        for f in self.factors[1:]:
+            m_r = xp.reshape( m_r[ : , : , None ] * xp.transpose( f[ : , index ] )[ : , None , : ], ( m_r.shape[0], -1 ) )
+        return m_r
+
+    def todense( self ):
+        m_r = self.factors[0]
+        for f in self.factors[1:]:
+            m_r = khatri_rao( m_r , f )
+        return m_r
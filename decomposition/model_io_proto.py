@@ -0,0 +1,176 @@
+'''
+This is a prototype module that defines an on-disk format for CP models that serving
+processes can memory map instead of unpickling.
+Layout, all little endian:
+    magic           8 bytes, b'TDCPMOD1'
+    header length   uint32, then a uint32 reserved for flags
+    data start      uint64, offset of the first array, a multiple of ALIGNMENT
+    header          JSON: tensor shape, rank, storage dtype and, for every array,
+                    its offset from data start, shape, dtype and crc32
+    arrays          weights (always float64), then factor 0 .. N-1, each C contiguous
+                    and starting on an ALIGNMENT byte boundary
+Arrays are returned as read-only views of a shared mmap, so processes that open the
+same file share its page cache pages and an array costs nothing until it is touched.
+ModelFile checks each array against its crc32 the first time it is accessed;
+load_model maps all factors at once and only verifies them when asked to.
+Files are host memory only and always read as numpy arrays.
+'''
+import os
+import json
+import mmap
+import zlib
+import struct
+import numpy as np
+import cp_model_proto as cm
+
+MAGIC = b'TDCPMOD1'
+VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct( '<8sIIQ' )
+STORAGE_DTYPES = { 'float16': '<f2', 'float32': '<f4', 'float64': '<f8' }
+
+
+def _align( offset ):
+    return -( -offset // ALIGNMENT ) * ALIGNMENT
+
+def save_model( path, model, dtype='float64' ):
+    """
+    write a model, replacing path atomically so that readers never see a partial file
+    :param path: output file
+    :param model: CPModel, or the (lambdas, factor_matrices) pair returned by cp_proto.cp_decomp
+    :param dtype: storage precision of the factors, float16, float32 or float64;
+        weights are always stored in float64
+    :return : number of bytes written
+    """
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError( 'unknown storage dtype ' + repr( dtype ) + ', use one of ' + str( list( STORAGE_DTYPES ) ) )
+    if not isinstance( model, cm.CPModel ):
+        model = cm.CPModel.from_decomp( *model )
+    arrays = [ np.ascontiguousarray( np.asarray( model.weights, dtype=np.float64 ) ) ]
+    arrays += [ np.ascontiguousarray( np.asarray( f ), dtype=STORAGE_DTYPES[dtype] ) for f in model.factors ]
+    entries = []
+    offset = 0
+    for a in arrays:
+        offset = _align( offset )
+        entries.append( { 'offset': offset, 'shape': list( a.shape ), 'dtype': a.dtype.str,
+                'crc32': zlib.crc32( a ) } )
+        offset += a.nbytes
+    header = json.dumps( { 'version': VERSION, 'shape': list( model.shape ), 'rank': int( model.rank ),
+            'dtype': dtype, 'arrays': entries } ).encode()
+    data_start = _align( _PREFIX.size + len( header ) )
+    tmp = path + '.tmp'
+    with open( tmp, 'wb' ) as f:
+        f.write( _PREFIX.pack( MAGIC, len( header ), 0, data_start ) )
+        f.write( header )
+        for a, entry in zip( arrays, entries ):
+            f.write( b'\0' * ( data_start + entry['offset'] - f.tell() ) )
+            f.write( a.tobytes() )
+        size = f.tell()
+    os.replace( tmp, path )
+    return size
+
+
+class ModelFile:
+    """
+    Read-only memory mapped model file with lazy, checksummed access per array.
+    """
+
+    def __init__( self, path, verify=True ):
+        """
+        :param path: file written by save_model
+        :param verify: check the crc32 of every array on its first access
+        """
+        self.path = path
+        self.verify = verify
+        with open( path, 'rb' ) as f:
+            self._mm = mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ )
+        if len( self._mm ) < _PREFIX.size:
+            self.close()
+            raise ValueError( path + ' is too short to be a model file' )
+        magic, header_len, flags, self._data_start = _PREFIX.unpack_from( self._mm, 0 )
+        if magic != MAGIC:
+            self.close()
+            raise ValueError( path + ' is not a model file (bad magic ' + repr( magic ) + ')' )
+        self.header = json.loads( bytes( self._mm[ _PREFIX.size : _PREFIX.size + header_len ] ) )
+        if self.header['version'] > VERSION:
+            self.close()
+            raise ValueError( path + ' has format version ' + str( self.header['version'] )
+                    + ', newer than ' + str( VERSION ) )
+        self.shape = tuple( self.header['shape'] )
+        self.rank = self.header['rank']
+        self.dtype = self.header['dtype']
+        self._arrays = {}
+
+    def __len__( self ):
+        return len( self.shape )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
+
+    def _array( self, i ):
+        if i not in self._arrays:
+            entry = self.header['arrays'][i]
+            a = np.frombuffer( self._mm, dtype=np.dtype( entry['dtype'] ),
+                    count=int( np.prod( entry['shape'] ) ), offset=self._data_start + entry['offset'] )
+            if self.verify and zlib.crc32( a ) != entry['crc32']:
+                name = 'weights' if i == 0 else 'factor ' + str( i - 1 )
+                raise ValueError( 'checksum mismatch for ' + name + ' of ' + self.path )
+            self._arrays[i] = a.reshape( entry['shape'] )
+        return self._arrays[i]
+
+    @property
+    def weights( self ):
+        return self._array( 0 )
+
+    def factor( self, n ):
+        """
+        :param n: mode
+        :return : read-only view of factor n in the storage dtype, mapped on first access
+        """
+        if not 0 <= n < len( self ):
+            raise IndexError( 'mode ' + str( n ) + ' out of range for a ' + str( len( self ) ) + '-way model' )
+        return self._array( n + 1 )
+
+    def close( self ):
+        """
+        drop the mapping; views handed out keep the pages alive until they are released
+        """
+        self._arrays = {}
+        try:
+            self._mm.close()
+        except BufferError:
+#           views still in use hold the mapping, it is released with them
+            pass
+
+
+def load_model( path, verify=False ):
+    """
+    map a model file into a CPModel. Without verification nothing is read here: the factors are
+    views of the mapping and only the pages touched by queries are faulted in, shared with every
+    other process mapping the file. The mapping is released with the last of those arrays.
+    For checksummed access to single factors use ModelFile( path, verify=True ).factor( n ), which
+    checks each array on its first access only
+    :param path: file written by save_model
+    :param verify: check the crc32 of every array now, which reads the whole file
+    :return : CPModel on the mapped factors (zero copy for float32 and float64 storage;
+        float16 factors are widened to float32 copies so queries do not accumulate in half precision)
+    """
+    with ModelFile( path, verify ) as mf:
+        factors = [ mf.factor( n ) for n in range( 0 , len( mf ) ) ]
+        if mf.dtype == 'float16':
+            factors = [ f.astype( np.float32 ) for f in factors ]
+        return cm.CPModel( mf.weights, factors )
+
+def load_decomp( path, verify=False ):
+    """
+    load a model in the form cp_proto.recomp takes, with the component weights folded into factor 0
+    :param path: file written by save_model
+    :param verify: check the crc32 of every array
+    :return : lambdas (ones, one per mode), list of factor matrices
+    """
+    model = load_model( path, verify )
+    factors = [ model.factors[0] * model.weights ] + model.factors[1:]
+    return np.ones( model.ndim ), factors
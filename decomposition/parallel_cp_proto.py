@@ -0,0 +1,195 @@
+'''
+This is a prototype module that defines a multi-process CP-ALS driver for tensors
+too large for one process to saturate the machine.
+The tensor is copied once into multiprocessing.shared_memory and split into slabs
+along mode 0; every worker process maps its slab with zero copy, keeps it for the
+whole decomposition and only ever contracts reshaped views of it (_slab_mttkrp).
+The factor matrices live in a second shared block written by the
+coordinator, and each worker writes its local MTTKRP into its own slot of a third one,
+so the pipes only carry the mode to update and a row count. The coordinator reduces
+the partials (a sum, or a concatenation for mode 0), solves the normal equations and
+publishes the new factor. Workers are started with the spawn method and a limited
+BLAS thread count so that processes, not BLAS threads, provide the parallelism.
+This path works on host memory, so it always runs on numpy.
+'''
+import os
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import math
+import cp_proto as cp
+import lin_alg_proto as la
+
+_BLAS_THREAD_VARS = [ 'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS' ]
+
+
+def _attach( name, shape ):
+    shm = shared_memory.SharedMemory( name=name )
+    return shm, np.ndarray( shape, dtype=np.float64, buffer=shm.buf )
+
+def _factor_views( buf, shape, num_factors ):
+    views = []
+    offset = 0
+    for size in shape:
+        views.append( buf[ offset : offset + size * num_factors ].reshape( size, num_factors ) )
+        offset += size * num_factors
+    return views
+
+def _restore_env( saved ):
+    for k, v in saved.items():
+        if v is None:
+            os.environ.pop( k, None )
+        else:
+            os.environ[k] = v
+
+def _khatri_rao_chain( factors ):
+    k_temp = factors[0]
+    for f in factors[1:]:
+        k_temp = la.khatri_rao( k_temp , f )
+    return k_temp
+
+def _slab_mttkrp( slab, factors, n ):
+    """
+    MTTKRP of a C contiguous slab without copying it. The slab is only reshaped (a view)
+    to left x I_n x right, where left and right flatten the modes before and after n;
+    the right modes are contracted with one GEMM and the left ones with an einsum on the
+    much smaller result, as for the root children in dimtree_proto.
+    :param slab: C contiguous tensor
+    :param factors: factor matrices matching the slab shape
+    :param n: mode being updated
+    :return : matrix of shape (slab.shape[n], num_components), equal to cp_proto.mttkrp
+    """
+    shape = slab.shape
+    left = math.prod( shape[:n] )
+    right = math.prod( shape[n + 1:] )
+    if n < len( shape ) - 1:
+        t_r = slab.reshape( ( left * shape[n], right ) ) @ _khatri_rao_chain( factors[n + 1:] )
+        t_r = t_r.reshape( ( left, shape[n], -1 ) )
+        if n == 0:
+            return t_r[0]
+        return np.einsum( 'lir,lr->ir', t_r, _khatri_rao_chain( factors[:n] ) )
+    return slab.reshape( ( left, shape[n] ) ).T @ _khatri_rao_chain( factors[:n] )
+
+def _worker( conn, tensor_name, shape, lo, hi, factor_name, out_name, slot, num_factors ):
+    """
+    Worker loop: receive a mode, compute the MTTKRP of the slab [lo:hi] into the output
+    slot, reply with the number of rows written. None shuts the worker down.
+    """
+    t_shm, tensor = _attach( tensor_name, shape )
+    f_shm, factor_buf = _attach( factor_name, ( sum( shape ) * num_factors, ) )
+    max_rows = max( shape )
+    o_shm, out = _attach( out_name, ( slot + 1, max_rows, num_factors ) )
+    slab = tensor[ lo : hi ]
+    factors = _factor_views( factor_buf, shape, num_factors )
+    try:
+        while True:
+            n = conn.recv()
+            if n is None:
+                break
+            local = [ factors[0][ lo : hi ] ] + factors[1:]
+            m = _slab_mttkrp( slab , local , n )
+            out[ slot , : m.shape[0] ] = m
+            conn.send( m.shape[0] )
+    finally:
+        del slab, tensor, factors, factor_buf, out
+        t_shm.close()
+        f_shm.close()
+        o_shm.close()
+
+
+def cp_decomp_parallel( tensor, num_factors, epochs, threshold, num_workers=None,
+        random_state=None, threads_per_worker=1 ):
+    """
+    function to carry out a CP-ALS decomposition with the MTTKRP split over worker processes.
+    Same model and stopping rule as cp_proto.cp_decomp
+    :param tensor: input tensor to carry out decomposition for
+    :param num_factors: number of rank-one factors to fit for
+    :param epochs: maximum number iterations
+    :param threshold: maximum acceptable error (frobenius norm of the residual)
+    :param num_workers: number of worker processes, defaults to the cpu count (at most shape[0])
+    :param random_state: seed for the random initialization
+    :param threads_per_worker: BLAS threads allowed in each worker
+    :return : weight vector (one scale per mode), factor matrices with unit frobenius norm
+    """
+    tensor = np.ascontiguousarray( tensor, dtype=np.float64 )
+    shape = tensor.shape
+    N = len( shape )
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max( 1, min( num_workers, shape[0] ) )
+    bounds = [ ( shape[0] * w ) // num_workers for w in range( 0 , num_workers + 1 ) ]
+
+    t_shm = shared_memory.SharedMemory( create=True, size=tensor.nbytes )
+    f_shm = shared_memory.SharedMemory( create=True, size=sum( shape ) * num_factors * 8 )
+    o_shm = shared_memory.SharedMemory( create=True, size=num_workers * max( shape ) * num_factors * 8 )
+    conns = []
+    procs = []
+    saved_env = { k: os.environ.get( k ) for k in _BLAS_THREAD_VARS }
+    try:
+        np.ndarray( shape, dtype=np.float64, buffer=t_shm.buf )[...] = tensor
+        factor_buf = np.ndarray( ( sum( shape ) * num_factors, ), dtype=np.float64, buffer=f_shm.buf )
+        out = np.ndarray( ( num_workers, max( shape ), num_factors ), dtype=np.float64, buffer=o_shm.buf )
+        factor_matrices = _factor_views( factor_buf, shape, num_factors )
+        rng = np.random.RandomState( random_state )
+        for i in range( 0 , N ):
+            factor_matrices[i][...] = rng.random_sample( ( shape[i], num_factors ) )
+
+        for k in _BLAS_THREAD_VARS:
+            os.environ[k] = str( threads_per_worker )
+        ctx = mp.get_context( 'spawn' )
+        for w in range( 0 , num_workers ):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process( target=_worker, args=( child, t_shm.name, shape, bounds[w], bounds[w + 1],
+                    f_shm.name, o_shm.name, w, num_factors ), daemon=True )
+            proc.start()
+            conns.append( parent )
+            procs.append( proc )
+        _restore_env( saved_env )
+
+        norm_x = float( np.linalg.norm( tensor ) )
+        ep_passed = 0
+        while True:
+            for n in range( 0 , N ):
+                for conn in conns:
+                    conn.send( n )
+                rows = [ conn.recv() for conn in conns ]
+                if n == 0:
+                    m = np.concatenate( [ out[ w , : rows[w] ] for w in range( 0 , num_workers ) ] )
+                else:
+                    m = out[ 0 , : rows[0] ].copy()
+                    for w in range( 1 , num_workers ):
+                        m += out[ w , : rows[w] ]
+                v = cp.gram( factor_matrices , n )
+                factor_matrices[n][...] = m @ np.linalg.pinv( v )
+            a = factor_matrices[N - 1]
+            inner = float( np.sum( m * a ) )
+            model_sq = float( np.sum( v * ( a.T @ a ) ) )
+            cost = max( norm_x ** 2 - 2 * inner + model_sq, 0 ) ** 0.5
+            ep_passed += 1
+            if not cost > threshold or not ep_passed < epochs:
+                break
+        lambdas = np.zeros( N )
+        result = []
+        for n in range( 0 , N ):
+            lambdas[n] = np.linalg.norm( factor_matrices[n] )
+            result.append( factor_matrices[n] / lambdas[n] )
+        del factor_matrices, factor_buf, out, a, m
+        return lambdas, result
+    finally:
+        _restore_env( saved_env )
+        for conn in conns:
+            try:
+                conn.send( None )
+            except OSError:
+                pass
+        for proc in procs:
+            proc.join( 5 )
+            if proc.is_alive():
+                proc.terminate()
+        for shm in ( t_shm, f_shm, o_shm ):
+            try:
+                shm.close()
+            except BufferError:
+#               views still referenced from an exception traceback, the mapping goes with them
+                pass
+            shm.unlink()
@@ -0,0 +1,220 @@
+'''
+This is a prototype module that defines streaming generators for synthetic test tensors
+of known rank, so benchmarks are not limited to tensors that fit in memory.
+SyntheticCP and SyntheticTucker draw ground-truth factors (and a Tucker core) once
+from a seed. Signed factors can be made collinear with a chosen congruence.
+The tensor itself is produced in slabs along mode 0, each reconstructed from the
+factor rows it needs. Gaussian noise at a relative level and a random sparsity mask
+are added per slab. Noise and mask for mode-0 row i come from a generator seeded
+with (seed, i), so the output does not depend on the chunk size. Slabs can be
+streamed, written to a .npy memmap, or gathered into a COOTensor holding only the
+nonzeros. Everything is generated on the host with numpy.
+'''
+import math
+import numpy as np
+import lin_alg_proto as la
+import cp_model_proto as cm
+
+CHUNK_BYTES = 64 * 2 ** 20
+
+
+def congruent_factor( rng, rows, rank, collinearity=0.0, nonnegative=False ):
+    """
+    random factor matrix with unit norm columns whose pairwise inner products (congruence)
+    equal collinearity; exact with rows >= rank, approximate otherwise. Nonnegative factors
+    are uniform random columns, whose congruence is already about 0.75, and take no collinearity
+    :param rng: numpy RandomState
+    :param rows: number of rows
+    :param rank: number of columns
+    :param collinearity: congruence in [0, 1), 0 for nonnegative factors
+    :param nonnegative: draw nonnegative entries
+    :return : matrix of shape (rows, rank)
+    """
+    if not 0 <= collinearity < 1:
+        raise ValueError( 'collinearity must be in [0, 1), got ' + str( collinearity ) )
+    if nonnegative:
+        if collinearity > 0:
+            raise ValueError( 'collinearity is not supported for nonnegative factors, got ' + str( collinearity ) )
+        a = rng.random_sample( ( rows, rank ) )
+    else:
+        a = rng.standard_normal( ( rows, rank ) )
+        if rows >= rank:
+            a = np.linalg.qr( a )[0]
+        c = np.full( ( rank, rank ), collinearity ) + ( 1 - collinearity ) * np.eye( rank )
+        a = a @ np.linalg.cholesky( c ).T
+    return a / np.linalg.norm( a, axis=0 )
+
+
+class COOTensor:
+    """
+    Coordinate format sparse tensor: coords (nnz x N) integer indices and nnz values.
+    """
+
+    __slots__ = ( 'coords', 'values', 'shape' )
+
+    def __init__( self, coords, values, shape ):
+        self.coords = coords
+        self.values = values
+        self.shape = tuple( shape )
+
+    @property
+    def nnz( self ):
+        return self.values.shape[0]
+
+    @property
+    def density( self ):
+        return self.nnz / math.prod( self.shape )
+
+    def todense( self ):
+        t_r = np.zeros( self.shape, dtype=self.values.dtype )
+        t_r[ tuple( self.coords.T ) ] = self.values
+        return t_r
+
+
+class _SyntheticTensor:
+    """
+    Shared streaming machinery; subclasses set shape, seed, noise, sparsity and
+    implement _block( lo, hi ) and _norm().
+    """
+
+    def _noise_scale( self ):
+#       per entry standard deviation giving a noise norm of noise times the tensor norm
+        return self.noise * self._norm() / math.sqrt( math.prod( self.shape ) )
+
+    def _chunk_rows( self, chunk_rows ):
+        if chunk_rows is None:
+            chunk_rows = CHUNK_BYTES // ( 8 * math.prod( self.shape[1:] ) )
+        return max( 1, min( chunk_rows, self.shape[0] ) )
+
+    def chunk( self, lo, hi ):
+        """
+        :param lo: first mode-0 index
+        :param hi: mode-0 index after the last
+        :return : the slab [lo:hi] of the tensor, noise and sparsity included
+        """
+        t_r = self._block( lo, hi )
+        scale = self._noise_scale() if self.noise > 0 else 0
+        if scale > 0 or self.sparsity > 0:
+            for i in range( lo , hi ):
+                rng = np.random.RandomState( [ self.seed, 1, i ] )
+                if scale > 0:
+                    t_r[i - lo] += scale * rng.standard_normal( self.shape[1:] )
+                if self.sparsity > 0:
+                    t_r[i - lo][ rng.random_sample( self.shape[1:] ) < self.sparsity ] = 0
+        return t_r
+
+    def chunks( self, chunk_rows=None ):
+        """
+        :param chunk_rows: mode-0 rows per slab, defaults to about CHUNK_BYTES per slab
+        :return : generator of (lo, hi, slab)
+        """
+        chunk_rows = self._chunk_rows( chunk_rows )
+        for lo in range( 0 , self.shape[0] , chunk_rows ):
+            hi = min( lo + chunk_rows, self.shape[0] )
+            yield lo, hi, self.chunk( lo, hi )
+
+    def full( self ):
+        """
+        :return : the whole dense tensor, only for sizes that fit in memory
+        """
+        return self.chunk( 0, self.shape[0] )
+
+    def to_memmap( self, path, chunk_rows=None, dtype='float64' ):
+        """
+        stream the tensor into a .npy file, holding one slab in memory at a time
+        :param path: output .npy file
+        :param chunk_rows: mode-0 rows per slab
+        :param dtype: storage dtype
+        :return : read-write numpy memmap of the file
+        """
+        out = np.lib.format.open_memmap( path, mode='w+', dtype=dtype, shape=self.shape )
+        for lo, hi, slab in self.chunks( chunk_rows ):
+            out[lo:hi] = slab
+        out.flush()
+        return out
+
+    def coo_chunks( self, chunk_rows=None ):
+        """
+        :param chunk_rows: mode-0 rows per slab
+        :return : generator of COOTensor, one per slab, with coordinates in the full tensor
+        """
+        for lo, hi, slab in self.chunks( chunk_rows ):
+            coords = np.argwhere( slab )
+            values = slab[ tuple( coords.T ) ]
+            coords[:, 0] += lo
+            yield COOTensor( coords, values, self.shape )
+
+    def to_coo( self, chunk_rows=None ):
+        """
+        :param chunk_rows: mode-0 rows per slab
+        :return : COOTensor of all nonzeros, built slab by slab
+        """
+        parts = list( self.coo_chunks( chunk_rows ) )
+        return COOTensor( np.concatenate( [ p.coords for p in parts ] ),
+                np.concatenate( [ p.values for p in parts ] ), self.shape )
+
+
+class SyntheticCP( _SyntheticTensor ):
+    """
+    Rank rank CP tensor, ground truth in weights / factors, or as a CPModel in model.
+    """
+
+    def __init__( self, shape, rank, noise=0.0, collinearity=0.0, sparsity=0.0,
+            nonnegative=False, weights=None, random_state=None ):
+        """
+        :param shape: tensor shape
+        :param rank: number of components
+        :param noise: norm of the Gaussian noise relative to the norm of the noiseless tensor
+        :param collinearity: congruence between the columns of every factor, signed factors only
+        :param sparsity: fraction of entries set to zero, chosen at random
+        :param nonnegative: nonnegative factors (and weights)
+        :param weights: component weights, defaults to ones
+        :param random_state: integer seed, None for a random one
+        """
+        self.shape = tuple( shape )
+        self.noise = noise
+        self.sparsity = sparsity
+        self.seed = np.random.RandomState().randint( 2 ** 31 ) if random_state is None else random_state
+        rng = np.random.RandomState( self.seed )
+        self.factors = [ congruent_factor( rng, s, rank, collinearity, nonnegative ) for s in self.shape ]
+        self.weights = np.ones( rank ) if weights is None else np.asarray( weights, dtype=np.float64 )
+        self.model = cm.CPModel( self.weights, self.factors )
+
+    def _norm( self ):
+        return self.model.norm()
+
+    def _block( self, lo, hi ):
+        return self.model.block( ( slice( lo, hi ), ) )
+
+
+class SyntheticTucker( _SyntheticTensor ):
+    """
+    Tucker tensor core x_0 factors[0] ... x_N-1 factors[N-1], ground truth in core / factors.
+    """
+
+    def __init__( self, shape, ranks, noise=0.0, collinearity=0.0, sparsity=0.0,
+            nonnegative=False, random_state=None ):
+        """
+        :param shape: tensor shape
+        :param ranks: multilinear rank, one per mode
+        :param noise: norm of the Gaussian noise relative to the norm of the noiseless tensor
+        :param collinearity: congruence between the columns of every factor, signed factors only
+        :param sparsity: fraction of entries set to zero, chosen at random
+        :param nonnegative: nonnegative core and factors
+        :param random_state: integer seed, None for a random one
+        """
+        self.shape = tuple( shape )
+        self.noise = noise
+        self.sparsity = sparsity
+        self.seed = np.random.RandomState().randint( 2 ** 31 ) if random_state is None else random_state
+        rng = np.random.RandomState( self.seed )
+        self.factors = [ congruent_factor( rng, s, r, collinearity, nonnegative ) for s, r in zip( self.shape, ranks ) ]
+        self.core = rng.random_sample( tuple( ranks ) ) if nonnegative else rng.standard_normal( tuple( ranks ) )
+
+    def _norm( self ):
+#       ||G x_n A_n||^2 = < G, G x_n A_n^T A_n >, on the core only
+        grams = [ f.T @ f for f in self.factors ]
+        return math.sqrt( max( float( np.sum( self.core * la.multi_mode_product( self.core, grams ) ) ), 0 ) )
+
+    def _block( self, lo, hi ):
+        return la.multi_mode_product( self.core, [ self.factors[0][lo:hi] ] + self.factors[1:] )
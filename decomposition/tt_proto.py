@@ -0,0 +1,143 @@
+'''
+This is a prototype module that defines the tensor-train (TT) decomposition.
+A tensor of order N is stored as N cores G_k of shape (r_k-1 x I_k x r_k) with
+r_0 = r_N = 1, so that T[i_1, ..., i_N] = G_1[:, i_1, :] @ ... @ G_N[:, i_N, :].
+Storage is linear in the order, which keeps high-order tensors tractable where
+the Khatri-Rao products of CP-ALS do not. The cores are computed by TT-SVD, a
+sweep of truncated SVDs whose ranks are chosen so that the relative error stays
+below eps. Rounding, inner products, norms and element access work on the cores
+only and never form the full tensor.
+'''
+import math
+import backend as bk
+
+
+def _truncation_rank( s, delta, max_rank=None ):
+    """
+    smallest rank whose discarded singular values have a 2-norm of at most delta
+    :param s: singular values in decreasing order
+    :param delta: absolute truncation error allowed
+    :param max_rank: upper bound on the rank, None for no bound
+    :return : rank to keep, at least 1
+    """
+    xp = bk.get_backend()
+#   tail[r] = norm of s[r:], so keep the first r values with tail[r] <= delta
+    tail = xp.sqrt( xp.cumsum( ( s * s )[::-1] ) )[::-1]
+    rank = int( xp.sum( tail > delta ) )
+    rank = max( rank, 1 )
+    if max_rank is not None:
+        rank = min( rank, max_rank )
+    return rank
+
+def tt_svd( tensor, eps=1e-10, max_rank=None ):
+    """
+    function to carry out a TT-SVD decomposition of a full tensor
+    :param tensor: input tensor, at least 2 modes
+    :param eps: maximum relative error (frobenius norm of the residual over the norm of tensor)
+    :param max_rank: upper bound on every TT rank, None for no bound (eps then holds exactly)
+    :return : list of N cores, core k of shape (r_k-1, shape[k], r_k)
+    """
+    xp = bk.get_backend()
+    shape = tensor.shape
+    N = len( shape )
+    delta = eps / math.sqrt( N - 1 ) * float( xp.linalg.norm( tensor ) )
+    cores = []
+    rank = 1
+    c = tensor
+    for k in range( 0 , N - 1 ):
+        c = xp.reshape( c, ( rank * shape[k], -1 ) )
+        u, s, vt = xp.linalg.svd( c, full_matrices=False )
+        new_rank = _truncation_rank( s, delta, max_rank )
+        cores.append( xp.reshape( u[:, :new_rank], ( rank, shape[k], new_rank ) ) )
+        c = s[:new_rank, None] * vt[:new_rank]
+        rank = new_rank
+    cores.append( xp.reshape( c, ( rank, shape[N - 1], 1 ) ) )
+    return cores
+
+def tt_ranks( cores ):
+    """
+    :param cores: TT cores
+    :return : list of the N + 1 TT ranks, starting and ending with 1
+    """
+    return [ cores[0].shape[0] ] + [ g.shape[2] for g in cores ]
+
+def tt_num_params( cores ):
+    """
+    :param cores: TT cores
+    :return : number of stored entries
+    """
+    return sum( g.size for g in cores )
+
+def tt_full( cores ):
+    """
+    contract the cores back into the full tensor. Only meant for checks on small tensors
+    :param cores: TT cores
+    :return : full tensor
+    """
+    xp = bk.get_backend()
+    shape = tuple( g.shape[1] for g in cores )
+    t_r = cores[0]
+    for g in cores[1:]:
+        t_r = xp.tensordot( t_r, g, axes=( [t_r.ndim - 1], [0] ) )
+    return xp.reshape( t_r, shape )
+
+def tt_rounding( cores, eps=1e-10, max_rank=None ):
+    """
+    recompress a TT tensor to lower ranks: the cores are made right-orthogonal by a
+    right to left QR sweep, then truncated by a left to right SVD sweep
+    :param cores: TT cores, not modified
+    :param eps: maximum relative error introduced by the rounding
+    :param max_rank: upper bound on every TT rank, None for no bound
+    :return : list of rounded cores
+    """
+    xp = bk.get_backend()
+    N = len( cores )
+    cores = list( cores )
+    for k in range( N - 1 , 0 , -1 ):
+        r0, n, r1 = cores[k].shape
+        q, r = xp.linalg.qr( xp.transpose( xp.reshape( cores[k], ( r0, n * r1 ) ) ) )
+        cores[k] = xp.reshape( xp.transpose( q ), ( -1, n, r1 ) )
+        cores[k - 1] = xp.tensordot( cores[k - 1], xp.transpose( r ), axes=( [2], [0] ) )
+#   all cores but the first are orthogonal now, so the norm sits in the first one
+    delta = eps / math.sqrt( max( N - 1, 1 ) ) * float( xp.linalg.norm( cores[0] ) )
+    for k in range( 0 , N - 1 ):
+        r0, n, r1 = cores[k].shape
+        u, s, vt = xp.linalg.svd( xp.reshape( cores[k], ( r0 * n, r1 ) ), full_matrices=False )
+        new_rank = _truncation_rank( s, delta, max_rank )
+        cores[k] = xp.reshape( u[:, :new_rank], ( r0, n, new_rank ) )
+        cores[k + 1] = xp.tensordot( s[:new_rank, None] * vt[:new_rank], cores[k + 1], axes=( [1], [0] ) )
+    return cores
+
+def tt_inner( cores_a, cores_b ):
+    """
+    inner product of two TT tensors of the same shape, contracted core by core
+    in O(N * I * r^3) without forming either tensor
+    :param cores_a: TT cores of the first tensor
+    :param cores_b: TT cores of the second tensor
+    :return : sum of the elementwise product of the two tensors
+    """
+    xp = bk.get_backend()
+    v = xp.ones( ( 1, 1 ) )
+    for a, b in zip( cores_a, cores_b ):
+#       v is (r_a x r_b): first absorb it into a, then contract with b over (r_b, i)
+        w = xp.tensordot( v, a, axes=( [0], [0] ) )
+        v = xp.tensordot( w, b, axes=( [0, 1], [0, 1] ) )
+    return float( v[0, 0] )
+
+def tt_norm( cores ):
+    """
+    :param cores: TT cores
+    :return : frobenius norm of the TT tensor
+    """
+    return math.sqrt( max( tt_inner( cores, cores ), 0 ) )
+
+def tt_element( cores, index ):
+    """
+    :param cores: TT cores
+    :param index: tuple with one index per mode
+    :return : the entry of the TT tensor at index, a product of N small matrices
+    """
+    v = cores[0][:, index[0], :]
+    for g, i in zip( cores[1:], index[1:] ):
+        v = v @ g[:, i, :]
+    return float( v[0, 0] )
@@ -1,14 +1,21 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import time
 import subprocess as sp
 import os
+import sys
 import csv
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import sweep
+import report
+import roofline
 """
 Set of functions for running scripts specified number of times and scraping data when benchmarking numpy functions
+Every test takes a backend name (see decomposition/backend.py), which is forwarded to the
+bench_* scripts and selects the suffix of the data files written.
+Tests only measure and store results in data/, figures are rendered afterwards by report.py.
+Usage: python3 bench_collect.py [backend]
 """
 
-def test_matrix_creation(max_dim_size, interval, num_samples, cores=1):
+def test_matrix_creation(max_dim_size, interval, num_samples, cores=1, backend='numpy'):
     """
     Purpose:
         Run matrix creation tests on dimension size, scaling up from 1 in intervals of interval
@@ -16,11 +23,11 @@ def test_matrix_creation(max_dim_size, interval, num_samples, cores=1):
     :param max_dim_size: largest dimension size to time
     :param interval: interval to increment by
     :param num_samples: number of samples to average over
+    :param backend: name of the array backend to benchmark
     """
-    dims = []
-    times = []
+    suffix = bk.data_suffix(backend)
 #   create file
-    with open('data/data_norm_m_creation.csv', 'w') as csvfile:
+    with open('data/data_norm_m_creation' + suffix + '.csv', 'w') as csvfile:
         writer = csv.writer(csvfile, delimiter=';',
                 quotechar='|', quoting=csv.QUOTE_MINIMAL)
 #       writer.writerow(['dimension', 'time', 'num_samples'])
@@ -29,126 +36,234 @@ def test_matrix_creation(max_dim_size, interval, num_samples, cores=1):
         procs = []
         for i in range(d, d + (interval * cores), interval):
             print(i)
-            proc = sp.Popen(['python3', 'bench_norm_m_creation.py', str(i), str(num_samples)])
+            proc = sp.Popen(['python3', 'bench_norm_m_creation.py', str(i), str(num_samples), backend])
             procs.append(proc.pid)
         for proc in procs:
             os.waitpid(proc, 0)
-#   gather data
-    with open('data/data_norm_m_creation.csv', 'r') as csvfile:
-        reader = csv.reader(csvfile, delimiter=';',
-                quotechar='|')
-        for row in reader:
-            print(row)
-            dims.append(int(row[0]))
-            times.append(float(row[1]) / float(row[2]))
 
-#   plot data
-    plt.xlabel("Matrix dimension (square matrix)")
-    plt.ylabel("Time elapsed (sec)")
-    plt.title('Random Gaussian Matrix Generation Benchmarking')
-    plt.plot(range(1, max_dim_size, interval), times)
-    plt.xscale('log')
-    plt.tight_layout()
-    plt.savefig('figures/test_matrix_creation.eps', format='eps', dpi=1000)
+def _measure_mm_mult(points, k, num_samples, cores, backend):
+    """
+    Launch bench_mm_mult.py for every d in points, cores processes at a time.
+    Each process appends its row to the stored results as soon as it finishes.
+    """
+    for j in range(0, len(points), cores):
+        procs = []
+        for i in points[j:j + cores]:
+            print(i, k)
+            proc = sp.Popen(['python3', 'bench_mm_mult.py', str(i), str(k), str(num_samples), backend])
+            procs.append(proc.pid)
+        for proc in procs:
+            os.waitpid(proc, 0)
 
 def test_matrix_matrix_mult(max_d_size, max_k_size,
         d_interval, k_interval,
-        num_samples, cores=1):
+        num_samples, cores=1, backend='numpy',
+        max_age=None, adaptive=False, slope_tol=0.5, max_refine=4):
     """
     Purpose:
         Run dxd against dxk matrix multiplication tests, scaling up d in
-        intervals of d_interval, each color represents different k
+        intervals of d_interval, each color represents different k.
+        Points already stored in data/all_k_mm_mult.csv for this environment
+        (see sweep.py) are reused, so an interrupted or tweaked sweep only
+        measures what is missing.
         :param max_d_size: dxd cross dxk, maximum d
         :param max_k_size: dxd cross dxk, maximum k
         :param d_interval: interval to increase d by
         :param k_interval: interval to increase k by
         :param num_samples: number of samples to test each point for
+        :param backend: name of the array backend to benchmark
+        :param max_age: seconds after which a stored point is remeasured, None to keep forever
+        :param adaptive: refine the d grid where the log-log timing curve changes slope,
+            treating d_interval as the coarse spacing
+        :param slope_tol: slope change that triggers refinement
+        :param max_refine: maximum number of refinement passes per k
     """
-    heatmap_data = {}
-    plt.tight_layout()
-    plt.figure(0)
+    suffix = bk.data_suffix(backend)
+    path = 'data/all_k_mm_mult' + suffix + '.csv'
+    env = sweep.env_key(backend)
+
+    def stored(k):
+        results = sweep.load_results(path, 2, env, max_age)
+        return {d: float(v[0]) / float(v[1]) for (d, kk), v in results.items()
+                if kk == k and int(v[1]) >= num_samples}
+
     for k in range(1, max_k_size, k_interval):
-        dims = []
-        times = []
-        with open('data/data_mm_mult.csv', 'w') as f:
-            f.truncate()
-        for d in range(1, max_dim_size, interval * cores):
-            procs = []
-            for i in range(d, d + (interval * cores), interval):
-                print(i)
-                proc = sp.Popen(['python3', 'bench_mm_mult.py', str(i), str(k), str(num_samples)])
-                procs.append(proc.pid)
-            for proc in procs:
-                os.waitpid(proc, 0)
-        with open('data/data_mm_mult.csv', 'r') as csvfile:
-            reader = csv.reader(csvfile, delimiter=';',
-                    quotechar='|')
-            for row in reader:
-                print(row)
-                dims.append(int(row[0]))
-                times.append(float(row[2]) / float(row[3]))
-        print(len(times))
-        plt.plot(dims, times, label='k = ' + str(k))
-        heatmap_data[k] = times 
-    plt.xlabel("Matrix dimension (square matrix) for first")
-    plt.ylabel("Time elapsed (sec)")
-    plt.xscale('log')
-    plt.title("Matrix by Matrix Multiplication Benchmark")
-    plt.legend(loc='best')
-    plt.savefig('figures/test_matrix_matrix_mult.eps', format='eps', dpi=1000)
-    plt.figure(1)
-    plt.xscale('linear')
-    plt.xlim(0, int(max_d_size / d_interval))
-    df = pd.DataFrame(heatmap_data)
-    plt.pcolor(df.T)
-    plt.ylabel("Second matrix dimension (k)")
-    plt.xlabel("First matrix dimension (d/"+str(d_interval)+")")
-    plt.colorbar()
-    plt.title('Matrix by Matrix Multiplication Heatmap')
-    plt.savefig('figures/est_matrix_matrix_mult_heatmap.eps', format='eps', dpi=1000)
+        grid = list(range(1, max_d_size, d_interval))
+        done = stored(k)
+        _measure_mm_mult([d for d in grid if d not in done], k, num_samples, cores, backend)
+        done = stored(k)
+        if adaptive:
+            for n in range(0, max_refine):
+                points = {d: done[d] for d in done if d in grid}
+                extra = sweep.refine(points, slope_tol)
+                if not extra:
+                    break
+                grid = sorted(grid + extra)
+                _measure_mm_mult([d for d in extra if d not in done], k, num_samples, cores, backend)
+                done = stored(k)
+        print(len([d for d in grid if d in done]))
 
-def test_inner_product_mult(max_d_size, d_interval, num_samples, cores=1):
+def test_inner_product_mult(max_d_size, d_interval, num_samples, cores=1, backend='numpy'):
     """
     Purpose:
         Run d dot d vector inner product tests, scaling up d in intervals of d_interval
     :param max_d_size: max dimension of each vector
     :param d_interval: interval to increment by
     :param num_samples: number of samples to average over to obtain each point
+    :param backend: name of the array backend to benchmark
     """
+    suffix = bk.data_suffix(backend)
     #   create file
-    with open('data/data_dot_prod.csv', 'w') as csvfile:
+    with open('data/data_dot_prod' + suffix + '.csv', 'w') as csvfile:
         writer = csv.writer(csvfile, delimiter=';',
                 quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    dims = []
-    times = []
-    for d in range(1, max_dim_size, interval * cores):
+    for d in range(1, max_d_size, d_interval * cores):
         procs = []
-        for i in range(d, d + (interval * cores), interval):
+        for i in range(d, d + (d_interval * cores), d_interval):
             print(i)
-            proc = sp.Popen(['python3', 'bench_dot_prod.py', str(i), str(num_samples)])
+            proc = sp.Popen(['python3', 'bench_dot_prod.py', str(i), str(num_samples), backend])
             procs.append(proc.pid)
         for proc in procs:
-            os.waitpid(proc)
-    with open('data_dot_product.csv', 'w') as csvfile:
-        writer = csv.writer(csvfile, delimiter=';',
-                quotechar='|', quoting=csv.QUOTE_MINIMAL)
-        for i in range(0, len(dims)):
-            writer.writerow(['dimension:('+str(dims[i])+'),time:'+str(times[i])+',num_samples:'+str(num_samples)])
-#   gather data
-    with open('data/data_dot_prod.csv', 'r') as csvfile:
-        reader = csv.reader(csvfile, delimiter=';',
-                quotechar='|')
-        for row in reader:
-            dims.append(int(row[0]))
-            times.append(float(row[1]) / float(row[2]))
-    plt.figure(2)
-    plt.xlabel("Size of each vector")
-    plt.ylabel("Time elapsed (sec)")
-    plt.plot(dims, times)
-    plt.xscale('log')
-    plt.tight_layout()
-    plt.savefig('figures/test_inner_product_mult.eps', format='eps', dpi=1000)
+            os.waitpid(proc, 0)
+
+def test_memory(kernel, max_d_size, d_interval, max_rank, rank_interval, order,
+        num_samples, cores=1, backend='numpy'):
+    """
+    Purpose:
+        Run peak and cumulative memory tests of a decomposition kernel
+        (khatri_rao, kronecker, recomp, mttkrp, cp_decomp, an mttkrp sweep or a CPModel query) over hypercube shapes,
+        scaling up d in intervals of d_interval, each color represents a different rank
+    :param kernel: name of the kernel, see bench_memory.py
+    :param max_d_size: maximum size of each mode
+    :param d_interval: interval to increase d by
+    :param max_rank: maximum rank (columns of each factor matrix)
+    :param rank_interval: interval to increase the rank by, also the first rank tested
+    :param order: number of modes of the tensor
+    :param num_samples: number of calls measured for each point
+    :param backend: name of the array backend to benchmark
+    """
+    suffix = bk.data_suffix(backend)
+    with open('data/data_memory_' + kernel + suffix + '.csv', 'w') as f:
+        f.truncate()
+    for r in range(rank_interval, max_rank + 1, rank_interval):
+        for d in range(1, max_d_size, d_interval * cores):
+            procs = []
+            for i in range(d, min(d + (d_interval * cores), max_d_size), d_interval):
+                print(kernel, i, r)
+                proc = sp.Popen(['python3', 'bench_memory.py', kernel, str(i), str(r), str(order),
+                    str(num_samples), backend])
+                procs.append(proc.pid)
+            for proc in procs:
+                os.waitpid(proc, 0)
+
+def test_ttm(variant, order, max_d_size, d_interval, j, num_samples, cores=1, backend='numpy'):
+    """
+    Purpose:
+        Run n-mode product (TTM) tests on hypercube tensors of the given order,
+        scaling up d in intervals of d_interval. Results accumulate in data/all_ttm.csv,
+        where the report keeps the latest row of every (variant, order, d, j)
+    :param variant: ttm, ttm_unfold, multi, multi_naive or batched, see bench_ttm.py
+    :param order: number of modes of the tensor
+    :param max_d_size: maximum size of each mode
+    :param d_interval: interval to increase d by
+    :param j: rows of the matrices multiplied in
+    :param num_samples: number of samples to average over to obtain each point
+    :param backend: name of the array backend to benchmark
+    """
+    for d in range(d_interval, max_d_size + 1, d_interval * cores):
+        procs = []
+        for i in range(d, min(d + (d_interval * cores), max_d_size + 1), d_interval):
+            print(variant, order, i)
+            proc = sp.Popen(['python3', 'bench_ttm.py', variant, str(order), str(i), str(j),
+                str(num_samples), backend])
+            procs.append(proc.pid)
+        for proc in procs:
+            os.waitpid(proc, 0)
+
+def test_parallel_cp(scaling, d, order, rank, max_workers, epochs, num_samples):
+    """
+    Purpose:
+        Run scaling tests of the multi-process CP-ALS driver for 1 .. max_workers worker
+        processes, plus the serial cp_decomp baseline (workers = 0). Runs are sequential,
+        since every run uses the whole machine. Results accumulate in data/all_parallel_cp.csv
+    :param scaling: strong (fixed tensor) or weak (mode 0 grows with the workers)
+    :param d: size of every mode (of each worker's slab for weak scaling)
+    :param order: number of modes of the tensor
+    :param rank: number of components fitted, also the rank of the test tensor
+    :param max_workers: largest number of worker processes
+    :param epochs: ALS sweeps per run
+    :param num_samples: number of samples to average over to obtain each point
+    """
+    for workers in range(0, max_workers + 1):
+        print(scaling, d, order, workers)
+        sp.call(['python3', 'bench_parallel_cp.py', scaling, str(d), str(order), str(rank),
+            str(workers), str(epochs), str(num_samples)])
+
+def test_tt(method, max_order, d, rank, num_samples, backend='numpy'):
+    """
+    Purpose:
+        Run TT-SVD versus CP-ALS tests on hypercube tensors of size d, scaling up the
+        order from 3 to max_order. Results accumulate in data/all_tt.csv
+    :param method: tt or cp, see bench_tt.py
+    :param max_order: maximum number of modes
+    :param d: size of every mode
+    :param rank: CP rank of the test tensor
+    :param num_samples: number of samples to average over to obtain each point
+    :param backend: name of the array backend to benchmark
+    """
+    for order in range(3, max_order + 1):
+        print(method, order, d)
+        sp.call(['python3', 'bench_tt.py', method, str(order), str(d), str(rank),
+            str(num_samples), backend])
+
+def test_job_service(mode, jobs, unique, max_workers, d, order, rank):
+    """
+    Purpose:
+        Run a batch of cp_decomp jobs through the job service or one process per job,
+        for 1 .. max_workers workers. Runs are sequential. Results accumulate in data/all_job_service.csv
+    :param mode: service or fork, see bench_job_service.py
+    :param jobs: number of jobs in the batch
+    :param unique: number of distinct input tensors among the jobs
+    :param max_workers: largest number of worker processes
+    :param d: size of every mode
+    :param order: number of modes of the tensors
+    :param rank: number of components fitted
+    """
+    for workers in range(1, max_workers + 1):
+        print(mode, jobs, unique, workers)
+        sp.call(['python3', 'bench_job_service.py', mode, str(jobs), str(unique), str(workers),
+            str(d), str(order), str(rank)])
 
-test_matrix_creation(100000, 500, 20)
-test_matrix_matrix_mult(100000, 500, 500, 50, 20)
-test_inner_product_mult(100000, 500, 20)
+if __name__ == '__main__':
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'numpy'
+    test_matrix_creation(100000, 500, 20, backend=backend)
+    test_matrix_matrix_mult(100000, 500, 500, 50, 20, backend=backend)
+    test_inner_product_mult(100000, 500, 20, backend=backend)
+    test_memory('khatri_rao', 200, 20, 20, 5, 3, 5, backend=backend)
+    test_memory('kronecker', 200, 20, 20, 5, 2, 5, backend=backend)
+    test_memory('recomp', 60, 10, 20, 5, 3, 5, backend=backend)
+    test_memory('mttkrp', 100, 10, 20, 5, 3, 5, backend=backend)
+    test_memory('cp_decomp', 30, 5, 10, 5, 3, 1, backend=backend)
+    test_memory('mttkrp_sweep', 30, 5, 20, 10, 4, 3, backend=backend)
+    test_memory('mttkrp_sweep_tree', 30, 5, 20, 10, 4, 3, backend=backend)
+    for kernel in ['kronecker_matvec', 'kronecker_matvec_lazy']:
+        test_memory(kernel, 200, 20, 20, 5, 2, 5, backend=backend)
+    for kernel in ['khatri_rao_matvec', 'khatri_rao_matvec_lazy']:
+        test_memory(kernel, 100, 20, 20, 5, 3, 5, backend=backend)
+    for kernel in ['synth_memmap', 'synth_coo']:
+        test_memory(kernel, 60, 10, 20, 5, 3, 3, backend=backend)
+    for kernel in ['model_load_pickle', 'model_load_mmap']:
+        test_memory(kernel, 100000, 20000, 20, 10, 3, 5, backend=backend)
+    for kernel in ['cp_model_values', 'cp_model_block']:
+        test_memory(kernel, 2000, 200, 20, 5, 4, 20, backend=backend)
+    for variant in ['ttm', 'ttm_unfold', 'multi', 'multi_naive', 'batched']:
+        test_ttm(variant, 3, 200, 20, 10, 5, backend=backend)
+        test_ttm(variant, 4, 40, 5, 10, 5, backend=backend)
+    for method in ['tt', 'cp']:
+        test_tt(method, 8, 8, 4, 3, backend=backend)
+    for scaling in ['strong', 'weak']:
+        test_parallel_cp(scaling, 100, 3, 10, os.cpu_count() or 1, 20, 3)
+    for mode in ['service', 'fork']:
+        test_job_service(mode, 200, 50, os.cpu_count() or 1, 30, 3, 5)
+    roofline.machine_peak(backend)
+    report.render_all()
@@ -0,0 +1,72 @@
+import os
+import csv
+import sys
+import time
+import asyncio
+import multiprocessing as mp
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import cp_proto as cp
+import job_service_proto as js
+import synth_proto as sy
+"""
+Lightweight script that benchmarks running a batch of cp_decomp jobs.
+Command line arguments: [mode, jobs, unique, workers, d, order, rank]
+jobs decompositions of hypercube tensors are requested, cycling through unique distinct tensors:
+    service  all submitted at once to a JobService with workers processes
+    fork     one freshly spawned process per job, at most workers at a time, no deduplication
+Every job runs EPOCHS sweeps. Rows store the wall time of the batch and, for the service,
+the p50 / p95 submit-to-finish latency.
+"""
+
+EPOCHS = 20
+
+def make_tensors(unique, d, order, rank):
+    shape = tuple([d] * order)
+    return [sy.SyntheticCP(shape, rank, nonnegative=True, random_state=j).full() for j in range(0, unique)]
+
+def _fork_job(tensor, rank):
+    cp.cp_decomp(tensor, rank, EPOCHS, 0, random_state=0)
+
+def run_fork(tensors, jobs, workers, rank):
+    ctx = mp.get_context('spawn')
+    running = []
+    for j in range(0, jobs):
+        if len(running) == workers:
+            running.pop(0).join()
+        proc = ctx.Process(target=_fork_job, args=(tensors[j % len(tensors)], rank))
+        proc.start()
+        running.append(proc)
+    for proc in running:
+        proc.join()
+    return {}
+
+async def run_service(tensors, jobs, workers, rank):
+    async with js.JobService(max_workers=workers) as service:
+        ids = [await service.submit(tensors[j % len(tensors)], num_factors=rank, epochs=EPOCHS,
+                threshold=0, random_state=0) for j in range(0, jobs)]
+        for job_id in ids:
+            await service.result(job_id)
+        return service.metrics()
+
+if __name__ == '__main__':
+    mode = sys.argv[1]
+    jobs = int(sys.argv[2])
+    unique = int(sys.argv[3])
+    workers = int(sys.argv[4])
+    d = int(sys.argv[5])
+    order = int(sys.argv[6])
+    rank = int(sys.argv[7])
+    tensors = make_tensors(unique, d, order, rank)
+    start = time.perf_counter()
+    if mode == 'service':
+        metrics = asyncio.run(run_service(tensors, jobs, workers, rank))
+    elif mode == 'fork':
+        metrics = run_fork(tensors, jobs, workers, rank)
+    else:
+        raise ValueError('unknown mode ' + repr(mode))
+    elapsed = time.perf_counter() - start
+    row = [mode, str(jobs), str(unique), str(workers), str(d), str(order), str(rank), str(elapsed),
+            str(metrics.get('latency_p50', '')), str(metrics.get('latency_p95', ''))]
+    with open('data/all_job_service.csv', 'a') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(row)
@@ -0,0 +1,246 @@
+import os
+import csv
+import sys
+import time
+import pickle
+import tempfile
+import threading
+import tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import lin_alg_proto as la
+import cp_proto as cp
+import dimtree_proto as dt
+import cp_model_proto as cm
+import model_io_proto as mio
+import synth_proto as sy
+"""
+Lightweight script that benchmarks the memory use of the decomposition kernels.
+Each call is timed first without instrumentation, then rerun under tracemalloc with a line
+tracer that adds up the bytes allocated, while a sampler thread polls the process RSS. Only host memory is seen,
+so for device backends the numbers cover host-side temporaries only.
+Command line arguments: [kernel, d, rank, order, num_samples, backend (optional, default numpy)]
+kernel is one of khatri_rao, kronecker, recomp, mttkrp, cp_decomp, and
+mttkrp_sweep / mttkrp_sweep_tree: the mttkrp of every mode in one ALS sweep, computed
+from scratch or through a dimension tree kept across calls (steady state of cp_decomp),
+kronecker_matvec / khatri_rao_matvec and their _lazy variants: product of the first two
+(Kronecker) or all (Khatri-Rao) factors with a vector, dense versus lin_alg_proto operators,
+cp_model_values / cp_model_block: CPModel point queries at QUERY_BATCH random index tuples and
+the reconstruction of a BLOCK^order corner block, whose cost should not grow with d,
+model_load_pickle / model_load_mmap: load a saved model and answer one query batch, from a
+pickled (lambdas, factor_matrices) tuple versus a model_io_proto file,
+synth_memmap / synth_coo: stream a noisy synthetic CP tensor slab by slab (SYNTH_CHUNK_ROWS rows of
+mode 0) into a .npy memmap, or into a COO tensor at SYNTH_SPARSITY, to compare with recomp
+"""
+
+CP_EPOCHS = 5
+QUERY_BATCH = 1024
+BLOCK = 4
+SYNTH_CHUNK_ROWS = 4
+SYNTH_SPARSITY = 0.99
+
+def _rss():
+    """
+    :return : resident set size of this process in bytes
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class MemorySampler(threading.Thread):
+    """
+    Background thread that polls the process RSS every interval seconds.
+    """
+
+    def __init__(self, interval=0.001):
+        threading.Thread.__init__(self, daemon=True)
+        self.interval = interval
+        self.base_rss = _rss()
+        self.peak_rss = 0
+        self._done = threading.Event()
+
+    def sample(self):
+        self.peak_rss = max(self.peak_rss, _rss() - self.base_rss)
+
+    def run(self):
+        while not self._done.is_set():
+            self.sample()
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+class AllocationTracer:
+    """
+    Line tracer counting the bytes allocated under tracemalloc. At every line, call and
+    return event in Python code it adds the rise of the traced peak over the traced memory
+    at the previous event, then resets the peak. Every temporary that raises the peak
+    within a line is counted however short it lives, e.g. the intermediates of a numpy
+    expression. Memory freed and allocated again within one line is counted once, and the
+    tracer's own bookkeeping adds a few bytes per event.
+    """
+
+    def __init__(self):
+        self.allocated = 0
+        self.peak = 0
+        self._last = 0
+
+    def _account(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.allocated += max(peak - self._last, 0)
+        self.peak = max(self.peak, peak)
+        tracemalloc.reset_peak()
+        self._last = current
+
+    def _trace(self, frame, event, arg):
+        self._account()
+        return self._trace
+
+    def start(self):
+        self._last = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        sys.settrace(self._trace)
+
+    def stop(self):
+        sys.settrace(None)
+        self._account()
+
+def measure_memory(func, num_samples, backend=None, interval=0.001):
+    """
+    Run func num_samples times, recording memory used on top of what was live before.
+    :param func: zero-argument callable to measure
+    :param num_samples: number of calls
+    :param backend: Backend to synchronize, defaults to the active backend
+    :param interval: RSS polling interval in seconds
+    :return : dict with peak_traced, cum_traced (bytes allocated over all calls, see
+        AllocationTracer) and peak_rss in bytes
+    """
+    if backend is None:
+        backend = bk.get_backend()
+    tracemalloc.start()
+    base_traced = tracemalloc.get_traced_memory()[0]
+    sampler = MemorySampler(interval)
+    tracer = AllocationTracer()
+    sampler.start()
+    tracer.start()
+    for i in range(0, num_samples):
+        func()
+        backend.synchronize()
+    tracer.stop()
+    sampler.stop()
+    tracemalloc.stop()
+    return {'peak_traced': tracer.peak - base_traced,
+            'cum_traced': tracer.allocated,
+            'peak_rss': sampler.peak_rss}
+
+def make_kernel(kernel, d, rank, order, xp, workdir):
+    """
+    Allocate the inputs for one kernel and return a closure running it, so input
+    allocation is not counted against the kernel.
+    :param kernel: kernel name
+    :param d: size of every mode
+    :param rank: number of columns of each factor matrix
+    :param order: number of modes (factor matrices)
+    :param xp: Backend to allocate on
+    :param workdir: directory for the files of the model_load_* and synth_memmap kernels,
+        owned by the caller
+    :return : zero-argument callable
+    """
+    factors = [xp.random.standard_normal((d, rank)) for i in range(0, order)]
+    if kernel == 'khatri_rao':
+        def run():
+            k_temp = factors[0]
+            for f in factors[1:]:
+                k_temp = la.khatri_rao(k_temp, f)
+            return k_temp
+        return run
+    if kernel == 'kronecker':
+        return lambda: la.kronecker(factors[0], factors[1])
+    if kernel in ('kronecker_matvec', 'kronecker_matvec_lazy'):
+        x = xp.random.standard_normal(rank * rank)
+        if kernel.endswith('_lazy'):
+            op = la.KroneckerOperator(factors[0], factors[1])
+            return lambda: op.matvec(x)
+        return lambda: la.kronecker(factors[0], factors[1]) @ x
+    if kernel in ('khatri_rao_matvec', 'khatri_rao_matvec_lazy'):
+        x = xp.random.standard_normal(rank)
+        if kernel.endswith('_lazy'):
+            op = la.KhatriRaoOperator(*factors)
+            return lambda: op.matvec(x)
+        return lambda: la.KhatriRaoOperator(*factors).todense() @ x
+    if kernel == 'recomp':
+        lambdas = xp.ones(order)
+        return lambda: cp.recomp(factors, lambdas, tuple([d] * order))
+    if kernel == 'mttkrp':
+        tensor = cp.recomp(factors, xp.ones(order), tuple([d] * order))
+        return lambda: cp.mttkrp(tensor, factors, 0)
+    if kernel == 'mttkrp_sweep':
+        tensor = cp.recomp(factors, xp.ones(order), tuple([d] * order))
+        def run():
+            for n in range(0, order):
+                cp.mttkrp(tensor, factors, n)
+        return run
+    if kernel == 'mttkrp_sweep_tree':
+        tensor = cp.recomp(factors, xp.ones(order), tuple([d] * order))
+        tree = dt.DimensionTree(tensor, list(factors))
+        def run():
+            for n in range(0, order):
+                tree.mttkrp(n)
+                tree.update(n, factors[n])
+        return run
+    if kernel == 'cp_model_values':
+        model = cm.CPModel(xp.ones(rank), factors)
+        indices = xp.random.randint(0, d, (QUERY_BATCH, order))
+        return lambda: model.values(indices)
+    if kernel == 'cp_model_block':
+        model = cm.CPModel(xp.ones(rank), factors)
+        return lambda: model.block(tuple([slice(0, BLOCK)] * order))
+    if kernel in ('model_load_pickle', 'model_load_mmap'):
+        path = os.path.join(workdir, 'model')
+        indices = xp.random.randint(0, d, (QUERY_BATCH, order))
+        if kernel == 'model_load_mmap':
+            mio.save_model(path, (xp.ones(order), factors))
+            return lambda: mio.load_model(path).values(indices)
+        with open(path, 'wb') as f:
+            pickle.dump((xp.ones(order), factors), f)
+        def run():
+            with open(path, 'rb') as f:
+                return cm.CPModel.from_decomp(*pickle.load(f)).values(indices)
+        return run
+    if kernel == 'synth_memmap':
+        gen = sy.SyntheticCP(tuple([d] * order), rank, noise=0.01, random_state=0)
+        path = os.path.join(workdir, 'tensor.npy')
+        return lambda: gen.to_memmap(path, SYNTH_CHUNK_ROWS)
+    if kernel == 'synth_coo':
+        gen = sy.SyntheticCP(tuple([d] * order), rank, noise=0.01, sparsity=SYNTH_SPARSITY, random_state=0)
+        return lambda: gen.to_coo(SYNTH_CHUNK_ROWS)
+    if kernel == 'cp_decomp':
+        tensor = cp.recomp(factors, xp.ones(order), tuple([d] * order))
+        return lambda: cp.cp_decomp(tensor, rank, CP_EPOCHS, 0)
+    raise ValueError('unknown kernel ' + repr(kernel))
+
+if __name__ == '__main__':
+    kernel = sys.argv[1]
+    d = int(sys.argv[2])
+    rank = int(sys.argv[3])
+    order = int(sys.argv[4])
+    num_samples = int(sys.argv[5])
+    xp = bk.get_backend(sys.argv[6] if len(sys.argv) > 6 else None)
+    with tempfile.TemporaryDirectory() as workdir:
+        run = make_kernel(kernel, d, rank, order, xp, workdir)
+        elapsed = bk.time_call(run, num_samples, xp)
+        mem = measure_memory(run, num_samples, xp)
+    row = [kernel, str(d), str(rank), str(order), str(elapsed),
+            str(mem['peak_traced']), str(mem['cum_traced']), str(mem['peak_rss']),
+            str(num_samples)]
+    with open('data/data_memory_' + kernel + xp.suffix + '.csv', 'a') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(row)
+    with open('data/all_memory' + xp.suffix + '.csv', 'a') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(row)
@@ -1,26 +1,21 @@
-import numpy as np
-import time
+import os
 import csv
 import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import sweep
 """
 Lightweight script that benchmarks the performance of matrix-matrix multiplication.
-Command line arguments: [d, k, num_samples]
+Command line arguments: [d, k, num_samples, backend (optional, default numpy)]
 """
 
 d = int(sys.argv[1])
 k = int(sys.argv[2])
 num_samples = int(sys.argv[3])
-m1 = np.full((d,d), 0.5)
-m2 = np.full((d,k), 0.5)
-start = time.time()
-for i in range(0, num_samples):
-    np.matmul(m1, m2)
-end = time.time()
-with open('data/all_k_mm_mult.csv', 'a') as f:
+xp = bk.get_backend(sys.argv[4] if len(sys.argv) > 4 else None)
+m1 = xp.full((d,d), 0.5)
+m2 = xp.full((d,k), 0.5)
+elapsed = bk.time_call(lambda: xp.matmul(m1, m2), num_samples, xp)
+with open('data/all_k_mm_mult' + xp.suffix + '.csv', 'a') as f:
     writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow([str(d),str(k),str(end-start),str(num_samples)])
-with open('data/data_mm_mult.csv', 'a') as f:
-    writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow([str(d),str(k),str(end-start),str(num_samples)])
-
-
+    writer.writerow(sweep.stamp([str(d),str(k),str(elapsed),str(num_samples)], sweep.env_key(xp)))
@@ -1,20 +1,19 @@
-import numpy as np
-import time
+import os
 import csv
 import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
 """
-Lightweight script that benchmarks the performance of matrix-matrix multiplication.
-Command line arguments: [d, k, num_samples]
+Lightweight script that benchmarks the performance of random gaussian matrix creation.
+Command line arguments: [d, num_samples, backend (optional, default numpy)]
 """
 d = int(sys.argv[1])
 num_samples = int(sys.argv[2])
-start = time.time()
-for i in range(0, num_samples):
-    np.random.standard_normal((d, d))
-end = time.time()
-with open('data/data_norm_m_creation.csv', 'a') as f:
+xp = bk.get_backend(sys.argv[3] if len(sys.argv) > 3 else None)
+elapsed = bk.time_call(lambda: xp.random.standard_normal((d, d)), num_samples, xp)
+with open('data/data_norm_m_creation' + xp.suffix + '.csv', 'a') as f:
     writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow([str(d), str(end-start), str(num_samples)])
-with open('data/all_norm_m_creation.csv', 'a') as f:
+    writer.writerow([str(d), str(elapsed), str(num_samples)])
+with open('data/all_norm_m_creation' + xp.suffix + '.csv', 'a') as f:
     writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow([str(d), str(end-start), str(num_samples)])
\ No newline at end of file
+    writer.writerow([str(d), str(elapsed), str(num_samples)])
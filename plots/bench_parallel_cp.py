@@ -0,0 +1,46 @@
+import os
+import csv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import cp_proto as cp
+import parallel_cp_proto as pcp
+import synth_proto as sy
+"""
+Lightweight script that benchmarks the shared-memory multi-process CP-ALS driver.
+Command line arguments: [scaling, d, order, rank, workers, epochs, num_samples]
+scaling is one of
+    strong   fixed hypercube tensor of size d, more workers on the same problem
+    weak     mode 0 grows to d * workers, so every worker keeps a slab of d rows
+workers = 0 times the serial cp_proto.cp_decomp on the same tensor as the baseline.
+Every run does exactly epochs sweeps (threshold 0); process start-up is included.
+"""
+
+def make_tensor(scaling, d, order, rank, workers):
+    """
+    :return : exact rank-rank tensor with the shape for this scaling mode
+    """
+    shape = tuple([d * max(workers, 1) if scaling == 'weak' else d] + [d] * (order - 1))
+    return sy.SyntheticCP(shape, rank, nonnegative=True, random_state=0).full()
+
+if __name__ == '__main__':
+    scaling = sys.argv[1]
+    d = int(sys.argv[2])
+    order = int(sys.argv[3])
+    rank = int(sys.argv[4])
+    workers = int(sys.argv[5])
+    epochs = int(sys.argv[6])
+    num_samples = int(sys.argv[7])
+    if scaling not in ('strong', 'weak'):
+        raise ValueError('unknown scaling ' + repr(scaling))
+    tensor = make_tensor(scaling, d, order, rank, workers)
+    if workers == 0:
+        run = lambda: cp.cp_decomp(tensor, rank, epochs, 0, random_state=0)
+    else:
+        run = lambda: pcp.cp_decomp_parallel(tensor, rank, epochs, 0, num_workers=workers, random_state=0)
+    elapsed = bk.time_call(run, num_samples, bk.get_backend('numpy'))
+    row = [scaling, str(d), str(order), str(rank), str(workers), str(epochs), str(elapsed),
+            str(num_samples), str(os.cpu_count())]
+    with open('data/all_parallel_cp.csv', 'a') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(row)
@@ -0,0 +1,53 @@
+import os
+import csv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import cp_proto as cp
+import tt_proto as tt
+import synth_proto as sy
+"""
+Lightweight script that benchmarks the TT-SVD decomposition against CP-ALS on the same input:
+a hypercube tensor of exact CP rank rank (so TT ranks of at most rank) plus NOISE relative noise.
+Command line arguments: [method, order, d, rank, num_samples, backend (optional, default numpy)]
+method is tt (tt_svd with relative error EPS) or cp (cp_decomp with the matching absolute
+threshold, at most CP_EPOCHS sweeps). Every row stores the time per call, the relative error
+of the result and the number of stored parameters.
+"""
+
+NOISE = 1e-4
+EPS = 1e-3
+CP_EPOCHS = 100
+
+def make_tensor(order, d, rank, xp):
+    gen = sy.SyntheticCP(tuple([d] * order), rank, noise=NOISE, nonnegative=True, random_state=0)
+    return xp.asarray(gen.full())
+
+if __name__ == '__main__':
+    method = sys.argv[1]
+    order = int(sys.argv[2])
+    d = int(sys.argv[3])
+    rank = int(sys.argv[4])
+    num_samples = int(sys.argv[5])
+    xp = bk.get_backend(sys.argv[6] if len(sys.argv) > 6 else None)
+    tensor = make_tensor(order, d, rank, xp)
+    norm = float(xp.linalg.norm(tensor))
+    if method == 'tt':
+        run = lambda: tt.tt_svd(tensor, EPS)
+    elif method == 'cp':
+        run = lambda: cp.cp_decomp(tensor, rank, CP_EPOCHS, EPS * norm, random_state=0)
+    else:
+        raise ValueError('unknown method ' + repr(method))
+    result = run()
+    elapsed = bk.time_call(run, num_samples, xp)
+    if method == 'tt':
+        error = float(xp.linalg.norm(tt.tt_full(result) - tensor)) / norm
+        num_params = tt.tt_num_params(result)
+    else:
+        error = float(cp.fr_norm_tensor(tensor, cp.recomp(result[1], result[0], tensor.shape))) / norm
+        num_params = sum(f.size for f in result[1])
+    row = [method, str(order), str(d), str(rank), str(elapsed), str(error), str(num_params),
+            str(num_samples)]
+    with open('data/all_tt' + xp.suffix + '.csv', 'a') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(row)
@@ -0,0 +1,62 @@
+import os
+import csv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import lin_alg_proto as la
+import cp_proto as cp
+"""
+Lightweight script that benchmarks the n-mode (TTM) product kernels on hypercube tensors.
+Command line arguments: [variant, order, d, j, num_samples, backend (optional, default numpy)]
+variant is one of
+    ttm          mode_n_product along the middle mode with a (j x d) matrix
+    ttm_unfold   the same product by hand: unfold, matmul, reshape and move the mode back
+    multi        multi_mode_product over all modes, mode 0 growing to 2d, the others shrinking to j
+    multi_naive  the same chain applied in mode order with mode_n_product
+    batched      batched_mode_n_product of BATCH tensors with one (j x d) matrix each
+"""
+
+BATCH = 16
+
+def make_kernel(variant, order, d, j, xp):
+    """
+    :return : zero-argument callable running one product on preallocated inputs
+    """
+    n = order // 2
+    if variant == 'batched':
+        tensors = xp.random.standard_normal((BATCH,) + tuple([d] * order))
+        mats = xp.random.standard_normal((BATCH, j, d))
+        return lambda: la.batched_mode_n_product(tensors, mats, n)
+    tensor = xp.random.standard_normal(tuple([d] * order))
+    m = xp.random.standard_normal((j, d))
+    if variant == 'ttm':
+        return lambda: la.mode_n_product(tensor, m, n)
+    if variant == 'ttm_unfold':
+        rest = tuple([d] * (order - 1))
+        return lambda: xp.moveaxis(xp.reshape(m @ cp.unfold(tensor, n), (j,) + rest), 0, n)
+    mats = [xp.random.standard_normal((2 * d, d))] + [xp.random.standard_normal((j, d)) for i in range(1, order)]
+    if variant == 'multi':
+        return lambda: la.multi_mode_product(tensor, mats)
+    if variant == 'multi_naive':
+        def run():
+            t_r = tensor
+            for i in range(0, order):
+                t_r = la.mode_n_product(t_r, mats[i], i)
+            return t_r
+        return run
+    raise ValueError('unknown variant ' + repr(variant))
+
+if __name__ == '__main__':
+    variant = sys.argv[1]
+    order = int(sys.argv[2])
+    d = int(sys.argv[3])
+    j = int(sys.argv[4])
+    num_samples = int(sys.argv[5])
+    xp = bk.get_backend(sys.argv[6] if len(sys.argv) > 6 else None)
+    run = make_kernel(variant, order, d, j, xp)
+    run()
+    elapsed = bk.time_call(run, num_samples, xp)
+    row = [variant, str(order), str(d), str(j), str(elapsed), str(num_samples)]
+    with open('data/all_ttm' + xp.suffix + '.csv', 'a') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(row)
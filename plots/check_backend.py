@@ -0,0 +1,41 @@
+import os
+import sys
+import runpy
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import sweep
+"""
+Self-check of the backend layer with a mock backend: numpy behind a counting synchronize,
+registered without an explicit Backend suffix. bench_mm_mult.py is run in this process on
+the mock backend inside a scratch directory, and the row it writes has to come back through
+the sweep helpers from data/all_k_mm_mult_mock.csv, with nothing written to the numpy files.
+Usage: python3 check_backend.py
+"""
+
+def mock_backend(calls):
+    import numpy as np
+    return bk.Backend('mock', np, synchronize=lambda: calls.append(1))
+
+if __name__ == '__main__':
+    calls = []
+    bk.register_backend('mock', lambda: mock_backend(calls))
+    xp = bk.get_backend('mock')
+    assert xp.suffix == bk.data_suffix('mock') == '_mock', xp.suffix
+    bench = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_mm_mult.py')
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            os.mkdir('data')
+            sys.argv = [bench, '8', '2', '3', 'mock']
+            runpy.run_path(bench, run_name='__main__')
+            written = os.listdir('data')
+            assert 'all_k_mm_mult_mock.csv' in written, written
+            assert all(name.endswith('_mock.csv') for name in written), written
+            results = sweep.load_results('data/all_k_mm_mult_mock.csv', 2, sweep.env_key('mock'))
+            assert list(results) == [(8, 2)] and results[(8, 2)][1] == '3', results
+        finally:
+            os.chdir(cwd)
+    assert calls, 'time_call did not synchronize the mock backend'
+    print('backend layer ok: mock row round-tripped through', 'all_k_mm_mult' + xp.suffix + '.csv')
@@ -0,0 +1,443 @@
+import os
+import re
+import csv
+import glob
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import roofline
+import sweep
+import backend as bk
+"""
+Standalone report stage: renders every figure from the stored benchmark results in data/.
+Figures are built on explicit matplotlib Figure objects (no pyplot global state), rendered
+in parallel worker processes, and only re-rendered when their input data or the output
+settings changed. A content hash per figure is kept in figures/.report_cache.json.
+Usage: python3 report.py [--format png|svg|pdf|eps] [--dpi N] [--workers N] [--force]
+"""
+
+DATA_DIR = 'data'
+FIG_DIR = 'figures'
+CACHE_FILE = '.report_cache.json'
+
+class NoData(Exception):
+    """
+    Raised by a renderer whose inputs hold nothing to plot; the figure is skipped.
+    """
+
+def new_figure(figsize=(6.4, 4.8)):
+    """
+    :param figsize: size in inches
+    :return : (Figure, Axes) not registered with pyplot
+    """
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    return fig, fig.add_subplot(1, 1, 1)
+
+def save_figure(fig, path, fmt='png', dpi=150):
+    """
+    Save a figure built with new_figure. dpi only matters for raster formats.
+    :param fig: Figure to save
+    :param path: output path without extension
+    :param fmt: png for raster output, svg, pdf or eps for vector output
+    :param dpi: raster resolution
+    :return : path written
+    """
+    out = path + '.' + fmt
+    fig.tight_layout()
+    fig.savefig(out, format=fmt, dpi=dpi)
+    return out
+
+def read_rows(path):
+    """
+    :param path: ';' separated results file
+    :return : list of rows (lists of strings)
+    """
+    with open(path, 'r') as csvfile:
+        return [row for row in csv.reader(csvfile, delimiter=';', quotechar='|') if row]
+
+def plot_matrix_creation(inputs, out, fmt, dpi):
+    dims = []
+    times = []
+    for row in read_rows(inputs[0]):
+        dims.append(int(row[0]))
+        times.append(float(row[1]) / float(row[2]))
+    fig, ax = new_figure()
+    ax.plot(dims, times)
+    ax.set_xlabel("Matrix dimension (square matrix)")
+    ax.set_ylabel("Time elapsed (sec)")
+    ax.set_title('Random Gaussian Matrix Generation Benchmarking')
+    ax.set_xscale('log')
+    return save_figure(fig, out, fmt, dpi)
+
+RANK_SWEEP_TITLES = {
+    'random_cp_creation': 'Random CP-Decomposable Tensor Generation Benchmarking',
+    'random_tucker_creation': 'Random Tucker-Decomposable Tensor Generation Benchmarking',
+    'cp_decomposition': 'CP Decomposition Benchmarking',
+    'tucker_decomposition': 'Tucker Decomposition Benchmarking',
+}
+
+def plot_rank_sweep(inputs, out, fmt, dpi):
+    name = re.match(r'tensorly_(.*)\.csv$', os.path.basename(inputs[0])).group(1)
+    table = {}
+    for row in read_rows(inputs[0]):
+        table.setdefault(int(row[0]), {})[int(row[1])] = float(row[2]) / float(row[3])
+    fig, ax = new_figure()
+    for r in sorted(table):
+        dims = sorted(table[r])
+        ax.plot(dims, [table[r][d] for d in dims], label='r = ' + str(r))
+    ax.set_xlabel("Matrix dimension (square matrix)")
+    ax.set_ylabel("Time elapsed (sec)")
+    ax.set_title(RANK_SWEEP_TITLES.get(name, name))
+    ax.legend(loc='best')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_nonnegative_cp(inputs, out, fmt, dpi):
+    table = {}
+    for row in read_rows(inputs[0]):
+        table.setdefault((int(row[1]), row[0]), {})[int(row[2])] = float(row[3]) / float(row[5])
+    fig, ax = new_figure()
+    colors = {}
+    for r, method in sorted(table):
+        dims = sorted(table[(r, method)])
+        label = ('ncp_hals' if method == 'ncp_hals' else 'tensorly') + ', r = ' + str(r)
+        line = ax.plot(dims, [table[(r, method)][d] for d in dims], color=colors.get(r),
+                linestyle='-' if method == 'ncp_hals' else '--', label=label)[0]
+        colors[r] = line.get_color()
+    ax.set_xlabel("Matrix dimension (square matrix)")
+    ax.set_ylabel("Time elapsed (sec)")
+    ax.set_title('Nonnegative CP Decomposition Benchmarking')
+    ax.legend(loc='best')
+    return save_figure(fig, out, fmt, dpi)
+
+def _mm_mult_table(path):
+    """
+    :return : dict k -> dict d -> seconds per call, from the latest row of every point
+        stored by the reported environment (see sweep.report_env)
+    """
+    suffix = re.match(r'(?:all_k|numpy)_mm_mult(.*)\.csv$', os.path.basename(path)).group(1)
+    results = sweep.load_results(path, 2, sweep.report_env(path, 2, suffix))
+    if not results:
+        raise NoData('no stamped rows in ' + path)
+    table = {}
+    for (d, k), v in results.items():
+        table.setdefault(k, {})[d] = float(v[0]) / float(v[1])
+    return table
+
+def plot_matrix_matrix_mult(inputs, out, fmt, dpi):
+    table = _mm_mult_table(inputs[0])
+    fig, ax = new_figure()
+    for k in sorted(table):
+        dims = sorted(table[k])
+        ax.plot(dims, [table[k][d] for d in dims], label='k = ' + str(k))
+    ax.set_xlabel("Matrix dimension (square matrix) for first")
+    ax.set_ylabel("Time elapsed (sec)")
+    ax.set_xscale('log')
+    ax.set_title("Matrix by Matrix Multiplication Benchmark")
+    ax.legend(loc='best', fontsize='x-small', ncol=2)
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_matrix_matrix_mult_heatmap(inputs, out, fmt, dpi):
+    import numpy as np
+    table = _mm_mult_table(inputs[0])
+    ks = sorted(table)
+    dims = sorted(set(d for k in ks for d in table[k]))
+    grid = np.full((len(ks), len(dims)), np.nan)
+    for i, k in enumerate(ks):
+        for j, d in enumerate(dims):
+            grid[i, j] = table[k].get(d, np.nan)
+    fig, ax = new_figure()
+    mesh = ax.pcolormesh(np.ma.masked_invalid(grid))
+    fig.colorbar(mesh, ax=ax)
+    ax.set_yticks([i + 0.5 for i in range(0, len(ks))][::max(1, len(ks) // 10)])
+    ax.set_yticklabels([str(k) for k in ks][::max(1, len(ks) // 10)])
+    ax.set_ylabel("Second matrix dimension (k)")
+    ax.set_xlabel("First matrix dimension (grid index, d from "
+            + str(dims[0]) + " to " + str(dims[-1]) + ")")
+    ax.set_title('Matrix by Matrix Multiplication Heatmap')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_inner_product_mult(inputs, out, fmt, dpi):
+    dims = []
+    times = []
+    for row in read_rows(inputs[0]):
+        dims.append(int(row[0]))
+        times.append(float(row[1]) / float(row[2]))
+    fig, ax = new_figure()
+    ax.plot(dims, times)
+    ax.set_xlabel("Size of each vector")
+    ax.set_ylabel("Time elapsed (sec)")
+    ax.set_xscale('log')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_memory(inputs, out, fmt, dpi):
+    results = {}
+    kernel = ''
+    order = ''
+    for row in read_rows(inputs[0]):
+        kernel = row[0]
+        order = row[3]
+        points = results.setdefault(int(row[2]), ([], [], []))
+        points[0].append(int(row[1]))
+        points[1].append(int(row[5]) / 2**20)
+        points[2].append(int(row[6]) / 2**20 / float(row[8]))
+    fig, ax = new_figure()
+    for r in sorted(results):
+        dims, peaks, cums = results[r]
+        line = ax.plot(dims, peaks, label='r = ' + str(r))[0]
+        ax.plot(dims, cums, linestyle='--', color=line.get_color())
+    ax.set_xlabel("Size of each mode (order " + order + ")")
+    ax.set_ylabel("Memory (MiB), solid: peak, dashed: allocated per call")
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_title(kernel + ' Memory Benchmark')
+    ax.legend(loc='best')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_ttm(inputs, out, fmt, dpi):
+    table = {}
+    for row in read_rows(inputs[0]):
+        key = (row[0], int(row[1]), int(row[3]))
+        table.setdefault(key, {})[int(row[2])] = float(row[4]) / float(row[5])
+    fig, ax = new_figure()
+    styles = {}
+    for variant, order, j in sorted(table):
+        dims = sorted(table[(variant, order, j)])
+        label = variant + ', N = ' + str(order) + ', j = ' + str(j)
+        linestyle = styles.setdefault(order, ['-', '--', ':', '-.'][len(styles) % 4])
+        ax.plot(dims, [table[(variant, order, j)][d] for d in dims], linestyle=linestyle, label=label)
+    ax.set_xlabel("Size of each mode")
+    ax.set_ylabel("Time elapsed (sec)")
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_title('n-mode Product Benchmark')
+    ax.legend(loc='best', fontsize='x-small', ncol=2)
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_parallel_cp(inputs, out, fmt, dpi):
+    table = {}
+    for row in read_rows(inputs[0]):
+        key = (row[0], int(row[1]), int(row[2]), int(row[3]), int(row[5]))
+        table.setdefault(key, {})[int(row[4])] = float(row[6]) / float(row[7])
+    fig, ax = new_figure()
+    for key in sorted(table):
+        times = table[key]
+        if 1 not in times:
+            continue
+        workers = sorted(w for w in times if w > 0)
+        # strong: T1 / (p Tp), weak: T1 / Tp, so ideal scaling is 1 for both
+        if key[0] == 'strong':
+            eff = [times[1] / (w * times[w]) for w in workers]
+        else:
+            eff = [times[1] / times[w] for w in workers]
+        label = key[0] + ', d = ' + str(key[1]) + ', N = ' + str(key[2]) + ', R = ' + str(key[3])
+        if 0 in times:
+            label += ', serial / 1 worker = %.2f' % (times[0] / times[1])
+        ax.plot(workers, eff, marker='o', linestyle='-' if key[0] == 'strong' else '--', label=label)
+    ax.axhline(1, color='gray', linewidth=0.8)
+    ax.set_xlabel("Worker processes")
+    ax.set_ylabel("Parallel efficiency")
+    ax.set_ylim(bottom=0)
+    ax.set_title('Multi-process CP-ALS Scaling')
+    ax.legend(loc='best', fontsize='x-small')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_tt(inputs, out, fmt, dpi):
+    table = {}
+    for row in read_rows(inputs[0]):
+        key = (row[0], int(row[2]), int(row[3]))
+        table.setdefault(key, {})[int(row[1])] = (float(row[4]) / float(row[7]), float(row[5]))
+    fig, ax = new_figure()
+    err_ax = ax.twinx()
+    for method, d, rank in sorted(table):
+        points = table[(method, d, rank)]
+        orders = sorted(points)
+        label = method + ', d = ' + str(d) + ', R = ' + str(rank)
+        line = ax.plot(orders, [points[o][0] for o in orders], marker='o', label=label)[0]
+        err_ax.plot(orders, [points[o][1] for o in orders], linestyle=':', color=line.get_color())
+    ax.set_xlabel("Tensor order")
+    ax.set_ylabel("Time elapsed (sec), solid")
+    err_ax.set_ylabel("Relative error, dotted")
+    ax.set_yscale('log')
+    err_ax.set_yscale('log')
+    ax.set_title('TT-SVD versus CP-ALS')
+    ax.legend(loc='upper left', fontsize='x-small')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_job_service(inputs, out, fmt, dpi):
+    table = {}
+    for row in read_rows(inputs[0]):
+        key = (row[0], int(row[1]), int(row[2]), int(row[4]), int(row[5]), int(row[6]))
+        table.setdefault(key, {})[int(row[3])] = int(row[1]) / float(row[7])
+    fig, ax = new_figure()
+    for key in sorted(table):
+        mode, jobs, unique, d, order, rank = key
+        workers = sorted(table[key])
+        label = mode + ', ' + str(jobs) + ' jobs / ' + str(unique) + ' unique, d = ' + str(d) + ', N = ' + str(order)
+        ax.plot(workers, [table[key][w] for w in workers], marker='o', label=label)
+    ax.set_xlabel("Worker processes")
+    ax.set_ylabel("Jobs per second")
+    ax.set_yscale('log')
+    ax.set_title('Decomposition Job Throughput')
+    ax.legend(loc='best', fontsize='x-small')
+    return save_figure(fig, out, fmt, dpi)
+
+def plot_roofline(inputs, out, fmt, dpi):
+    import numpy as np
+    points = roofline.stored_points(inputs[0])
+    if not points:
+        raise NoData('no modeled points in ' + inputs[0])
+    peak = roofline.load_peak(inputs[1]) if len(inputs) > 1 and os.path.exists(inputs[1]) else None
+    fig, ax = new_figure()
+    kernels = sorted(set(p[0] for p in points))
+    for kernel in kernels:
+        ais = []
+        rates = []
+        sizes = []
+        for name, params, seconds in points:
+            if name == kernel:
+                ai, gflops, gbs = roofline.achieved(name, params, seconds)
+                ais.append(ai)
+                rates.append(gflops)
+                sizes.append(params[0])
+        mesh = ax.scatter(ais, rates, c=np.log10(sizes), s=8, label=kernel)
+    fig.colorbar(mesh, ax=ax, label='log10 of first dimension')
+    if peak is not None:
+        peak_flops, peak_bw = peak
+        lo = min([p for p in ax.get_xlim()] + [peak_flops / peak_bw / 100])
+        hi = max(ax.get_xlim()[1], peak_flops / peak_bw * 10)
+        x = np.logspace(np.log10(max(lo, 1e-3)), np.log10(hi), 200)
+        ax.plot(x, np.minimum(peak_flops, x * peak_bw), color='black',
+                label='roof (%.0f GFLOP/s, %.0f GB/s)' % peak)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel("Arithmetic intensity (flop/byte)")
+    ax.set_ylabel("Achieved GFLOP/s")
+    ax.set_title('Roofline: ' + ', '.join(kernels))
+    ax.legend(loc='best', fontsize='small')
+    return save_figure(fig, out, fmt, dpi)
+
+RENDERERS = {
+    'matrix_creation': plot_matrix_creation,
+    'matrix_matrix_mult': plot_matrix_matrix_mult,
+    'matrix_matrix_mult_heatmap': plot_matrix_matrix_mult_heatmap,
+    'inner_product_mult': plot_inner_product_mult,
+    'memory': plot_memory,
+    'roofline': plot_roofline,
+    'ttm': plot_ttm,
+    'parallel_cp': plot_parallel_cp,
+    'tt': plot_tt,
+    'job_service': plot_job_service,
+    'rank_sweep': plot_rank_sweep,
+    'nonnegative_cp': plot_nonnegative_cp,
+}
+
+# data file suffixes of every registered backend, for patterns whose prefix another file name extends
+SUFFIX = '(' + '|'.join(sorted(re.escape(bk.data_suffix(name)) for name in bk.available_backends())) + ')'
+
+# (regex on data file name, [(renderer, figure name template, extra input templates)]);
+# \1.. are regex groups, extra inputs are other data files the figure reads if they exist
+SOURCES = [
+    (r'data_norm_m_creation(.*)\.csv$', [('matrix_creation', r'test_matrix_creation\1', [])]),
+    (r'all_k_mm_mult(.*)\.csv$', [('matrix_matrix_mult', r'test_matrix_matrix_mult\1', []),
+        ('matrix_matrix_mult_heatmap', r'est_matrix_matrix_mult_heatmap\1', []),
+        ('roofline', r'roofline_matrix_matrix_mult\1', [r'machine_peak\1.csv'])]),
+    (r'data_dot_prod(.*)\.csv$', [('inner_product_mult', r'test_inner_product_mult\1', []),
+        ('roofline', r'roofline_inner_product_mult\1', [r'machine_peak\1.csv'])]),
+    (r'data_memory_(.*)\.csv$', [('memory', r'test_memory_\1', [])]),
+    (r'all_ttm(.*)\.csv$', [('ttm', r'test_ttm\1', [])]),
+    (r'all_job_service(.*)\.csv$', [('job_service', r'test_job_service\1', [])]),
+    (r'all_tt' + SUFFIX + r'\.csv$', [('tt', r'test_tt\1', [])]),
+    (r'all_parallel_cp(.*)\.csv$', [('parallel_cp', r'test_parallel_cp\1', [])]),
+    (r'numpy_matrix_creation' + SUFFIX + r'\.csv$', [('matrix_creation', r'numpy_matrix_creation\1', [])]),
+    (r'numpy_mm_mult' + SUFFIX + r'\.csv$', [('matrix_matrix_mult', r'numpy_matrix_matrix_mult\1', []),
+        ('matrix_matrix_mult_heatmap', r'numpy_matrix_matrix_mult_heatmap\1', [])]),
+    (r'numpy_inner_product' + SUFFIX + r'\.csv$', [('inner_product_mult', r'numpy_inner_product_mult\1', [])]),
+    (r'tensorly_(' + '|'.join(RANK_SWEEP_TITLES) + r')\.csv$', [('rank_sweep', r'tensorly_\1', [])]),
+    (r'tensorly_nonnegative_cp\.csv$', [('nonnegative_cp', 'tensorly_nonnegative_cp_decomposition', [])]),
+    (r'data_memory_(khatri_rao|kronecker|recomp|mttkrp)' + SUFFIX + r'\.csv$',
+        [('roofline', r'roofline_\1\2', [r'machine_peak\2.csv'])]),
+]
+
+def figure_jobs(data_dir=DATA_DIR, fig_dir=FIG_DIR):
+    """
+    :return : list of (renderer name, input paths, output path without extension)
+    """
+    jobs = []
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        name = os.path.basename(path)
+        for pattern, figures in SOURCES:
+            match = re.match(pattern, name)
+            if match is None:
+                continue
+            for renderer, template, extra in figures:
+                inputs = [path] + [os.path.join(data_dir, match.expand(e)) for e in extra]
+                jobs.append((renderer, inputs, os.path.join(fig_dir, match.expand(template))))
+    return jobs
+
+def _digest(renderer, inputs, fmt, dpi):
+    h = hashlib.sha1((renderer + '|' + fmt + '|' + str(dpi)).encode())
+    for path in inputs:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+def _render(job):
+    import matplotlib
+    matplotlib.use('Agg')
+    renderer, inputs, out, fmt, dpi = job
+    try:
+        return RENDERERS[renderer](inputs, out, fmt, dpi), None
+    except NoData as e:
+        return None, 'skipped ' + out + ': ' + str(e)
+    except Exception as e:
+        return None, 'failed to render ' + out + ': ' + repr(e)
+
+def render_all(fmt='png', dpi=150, workers=None, force=False,
+        data_dir=DATA_DIR, fig_dir=FIG_DIR):
+    """
+    Render every figure whose inputs changed since the last report, in parallel.
+    :param fmt: png for raster output, svg, pdf or eps for vector output
+    :param dpi: raster resolution
+    :param workers: number of worker processes, defaults to the cpu count
+    :param force: re-render everything
+    :return : list of paths written
+    """
+    cache_path = os.path.join(fig_dir, CACHE_FILE)
+    cache = {}
+    if not force and os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    todo = []
+    digests = {}
+    for renderer, inputs, out in figure_jobs(data_dir, fig_dir):
+        digest = _digest(renderer, inputs, fmt, dpi)
+        target = out + '.' + fmt
+        if cache.get(target) == digest and os.path.exists(target):
+            continue
+        digests[target] = digest
+        todo.append((renderer, inputs, out, fmt, dpi))
+    written = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, message in pool.map(_render, todo):
+                if path is None:
+                    print(message)
+                    continue
+                print(path)
+                cache[path] = digests[path]
+                written.append(path)
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render benchmark figures from stored results')
+    parser.add_argument('--format', default='png', choices=['png', 'svg', 'pdf', 'eps'])
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    render_all(args.format, args.dpi, args.workers, args.force)
@@ -0,0 +1,179 @@
+import os
+import csv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import sweep
+"""
+Roofline instrumentation for the benchmarked kernels.
+Every kernel has an analytic model giving the floating point operations and the bytes
+moved to and from memory per call (float64, each operand read once and each result
+written once, i.e. perfect caching). Combined with the stored seconds per call this gives
+achieved GFLOP/s and GB/s, which are compared against the machine peak measured by a
+built-in matmul / stream triad microbenchmark. The bandwidth roof is main memory, so
+small problems that stay in cache can land above it.
+Usage: python3 roofline.py [backend]   measures the peak if needed and prints a summary
+"""
+
+WORD = 8
+
+def _khatri_rao_chain(d, rank, num):
+    """
+    :return : (flops, bytes) of the left to right Khatri-Rao product of num (d x rank) factors
+    """
+    flops = 0
+    moved = 0
+    rows = d
+    for i in range(1, num):
+        flops += rows * d * rank
+        moved += WORD * (rows * rank + d * rank + rows * d * rank)
+        rows *= d
+    return flops, moved
+
+def model_matmul(d, k):
+    return 2 * d * d * k, WORD * (d * d + 2 * d * k)
+
+def model_dot(d):
+    return 2 * d, WORD * 2 * d
+
+def model_khatri_rao(d, rank, order):
+    return _khatri_rao_chain(d, rank, order)
+
+def model_kronecker(d, rank, order):
+    return d * d * rank * rank, WORD * (2 * d * rank + d * d * rank * rank)
+
+def model_recomp(d, rank, order):
+    flops = 0
+    moved = 0
+    size = d
+    for i in range(1, order):
+        size *= d
+        flops += size
+        moved += WORD * size
+    # accumulate each rank-one term into the result: read both, write one
+    return rank * (flops + d ** order), rank * (moved + 3 * WORD * d ** order)
+
+def model_mttkrp(d, rank, order):
+    flops, moved = _khatri_rao_chain(d, rank, order - 1)
+    return (flops + 2 * d ** order * rank,
+            moved + WORD * (d ** order + d ** (order - 1) * rank + d * rank))
+
+MODELS = {
+    'matmul': model_matmul,
+    'dot': model_dot,
+    'khatri_rao': model_khatri_rao,
+    'kronecker': model_kronecker,
+    'recomp': model_recomp,
+    'mttkrp': model_mttkrp,
+}
+
+def achieved(kernel, params, seconds):
+    """
+    :param kernel: name in MODELS
+    :param params: tuple of model parameters
+    :param seconds: seconds per call
+    :return : (arithmetic intensity in flop/byte, GFLOP/s, GB/s)
+    """
+    flops, moved = MODELS[kernel](*params)
+    seconds = max(seconds, 1e-12)
+    return flops / moved, flops / seconds / 1e9, moved / seconds / 1e9
+
+def measure_peak(backend=None, n=2048, stream_len=2**25, repeats=5):
+    """
+    Microbenchmark the machine peak: best of repeats for an n x n matmul and for a
+    stream triad style add into a preallocated output (two reads, one write).
+    :param backend: Backend to measure, defaults to the active backend
+    :return : (peak GFLOP/s, peak GB/s)
+    """
+    if backend is None:
+        backend = bk.get_backend()
+    xp = backend
+    a = xp.random.standard_normal((n, n))
+    b = xp.random.standard_normal((n, n))
+    xp.matmul(a, b)
+    best = min(bk.time_call(lambda: xp.matmul(a, b), 1, xp) for i in range(0, repeats))
+    gflops = 2 * n ** 3 / best / 1e9
+    a = b = None
+    x = xp.empty(stream_len)
+    y = xp.full(stream_len, 0.5)
+    z = xp.full(stream_len, 0.25)
+    xp.add(y, z, out=x)
+    best = min(bk.time_call(lambda: xp.add(y, z, out=x), 1, xp) for i in range(0, repeats))
+    gbs = 3 * WORD * stream_len / best / 1e9
+    return gflops, gbs
+
+def peak_path(suffix):
+    return 'data/machine_peak' + suffix + '.csv'
+
+def load_peak(path, env=None):
+    """
+    :param path: machine peak file
+    :param env: environment fingerprint to match, None for the latest row of any environment
+    :return : (peak GFLOP/s, peak GB/s) or None if nothing is stored
+    """
+    if not os.path.exists(path):
+        return None
+    peak = None
+    with open(path, 'r') as csvfile:
+        for row in csv.reader(csvfile, delimiter=';', quotechar='|'):
+            if len(row) == 4 and (env is None or row[2] == env):
+                peak = (float(row[0]), float(row[1]))
+    return peak
+
+def machine_peak(backend='numpy', remeasure=False):
+    """
+    Return the stored machine peak for this environment, measuring it first if needed.
+    :param backend: name of the array backend
+    :param remeasure: ignore the stored value
+    :return : (peak GFLOP/s, peak GB/s)
+    """
+    path = peak_path(bk.data_suffix(backend))
+    env = sweep.env_key(backend)
+    peak = None if remeasure else load_peak(path, env)
+    if peak is None:
+        peak = measure_peak(bk.get_backend(backend))
+        with open(path, 'a') as f:
+            writer = csv.writer(f, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(sweep.stamp([str(peak[0]), str(peak[1])], env))
+    return peak
+
+def stored_points(path):
+    """
+    Read a stored results file and attach the model to every row.
+    :param path: all_k_mm_mult* (rows of the reported environment only, see sweep.report_env),
+        data_dot_prod* or data_memory_* results file
+    :return : list of (kernel, params, seconds per call) for modeled kernels
+    """
+    name = os.path.basename(path)
+    points = []
+    if name.startswith('all_k_mm_mult'):
+        suffix = name[len('all_k_mm_mult'):-len('.csv')]
+        results = sweep.load_results(path, 2, sweep.report_env(path, 2, suffix))
+        return [('matmul', key, float(v[0]) / float(v[1])) for key, v in sorted(results.items())]
+    with open(path, 'r') as csvfile:
+        for row in csv.reader(csvfile, delimiter=';', quotechar='|'):
+            if not row:
+                continue
+            if name.startswith('data_dot_prod') or name.startswith('all_dot_prod'):
+                points.append(('dot', (int(row[0]),), float(row[1]) / float(row[2])))
+            elif name.startswith('data_memory_') and row[0] in MODELS:
+                points.append((row[0], (int(row[1]), int(row[2]), int(row[3])),
+                    float(row[4]) / float(row[8])))
+    return points
+
+if __name__ == '__main__':
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'numpy'
+    suffix = bk.data_suffix(backend)
+    peak_flops, peak_bw = machine_peak(backend)
+    print('peak: %.1f GFLOP/s, %.1f GB/s, ridge at %.2f flop/byte'
+            % (peak_flops, peak_bw, peak_flops / peak_bw))
+    paths = ['data/all_k_mm_mult' + suffix + '.csv', 'data/data_dot_prod' + suffix + '.csv']
+    paths += ['data/data_memory_' + kernel + suffix + '.csv' for kernel in MODELS]
+    for path in paths:
+        if os.path.exists(path):
+            print(path)
+            for kernel, params, seconds in stored_points(path):
+                ai, gflops, gbs = achieved(kernel, params, seconds)
+                roof = min(peak_flops, ai * peak_bw)
+                print('  %-10s %-18s %8.2f GFLOP/s %8.2f GB/s  %5.1f%% of roof'
+                        % (kernel, params, gflops, gbs, 100 * gflops / roof))
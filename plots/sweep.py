@@ -0,0 +1,134 @@
+import os
+import re
+import csv
+import sys
+import time
+import math
+import hashlib
+import platform
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+"""
+Helpers for incremental, resumable parameter sweeps.
+Stored results (the data/all_*.csv files) are keyed by the swept parameters plus an
+environment fingerprint, so a sweep only measures points that are missing or stale.
+Rows are appended by the bench scripts as soon as a point is measured, which makes
+every finished point a checkpoint. Rows written before the fingerprint column existed
+carry no environment and are treated as stale.
+"""
+
+# env_key fingerprints are the first 12 hex digits of a sha1
+ENV_PATTERN = re.compile(r'[0-9a-f]{12}$')
+
+def env_key(backend=None):
+    """
+    :param backend: Backend or backend name, defaults to the active backend
+    :return : short fingerprint of host, python and array module version
+    """
+    if backend is None or isinstance(backend, str):
+        backend = bk.get_backend(backend)
+    parts = [platform.node(), platform.machine(), platform.python_version(),
+            str(os.cpu_count()), backend.name,
+            str(getattr(backend.xp, '__version__', ''))]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+def load_results(path, num_keys, env, max_age=None):
+    """
+    Read stored rows laid out as [key_1 .. key_n, value_1 .. value_m, env, timestamp].
+    :param path: csv file to read, a missing file yields no results
+    :param num_keys: number of leading integer key columns
+    :param env: environment fingerprint rows must match to be fresh
+    :param max_age: maximum age in seconds for a row to be fresh, None for no limit
+    :return : dict mapping key tuples to the value columns of the latest fresh row
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    now = time.time()
+    with open(path, 'r') as csvfile:
+        reader = csv.reader(csvfile, delimiter=';', quotechar='|')
+        for row in reader:
+            if len(row) < num_keys + 2 or row[-2] != env:
+                continue
+            if max_age is not None and now - float(row[-1]) > max_age:
+                continue
+            results[tuple(int(x) for x in row[:num_keys])] = row[num_keys:-2]
+    return results
+
+def stamped(row, num_keys):
+    """
+    :param row: list of column strings
+    :param num_keys: number of leading key columns
+    :return : True if row carries keys, at least one value, an env fingerprint and a timestamp
+    """
+    if len(row) < num_keys + 3 or ENV_PATTERN.match(row[-2]) is None:
+        return False
+    try:
+        float(row[-1])
+    except ValueError:
+        return False
+    return True
+
+def report_env(path, num_keys, suffix=''):
+    """
+    Pick the environment whose rows a report of a stored results file should show: the
+    fingerprint of this machine for the backend with the given data suffix if it stored any
+    rows, else the environment of the latest stamped row. Legacy rows never qualify.
+    :param path: csv file laid out as for load_results
+    :param num_keys: number of leading key columns
+    :param suffix: data file suffix of the backend that wrote path
+    :return : environment fingerprint, None if the file holds no stamped rows
+    """
+    latest = None
+    envs = set()
+    if os.path.exists(path):
+        with open(path, 'r') as csvfile:
+            for row in csv.reader(csvfile, delimiter=';', quotechar='|'):
+                if not stamped(row, num_keys):
+                    continue
+                when = float(row[-1])
+                envs.add(row[-2])
+                if latest is None or when >= latest[0]:
+                    latest = (when, row[-2])
+    for name in bk.available_backends():
+        if bk.data_suffix(name) != suffix:
+            continue
+        try:
+            env = env_key(name)
+        except ImportError:
+            continue
+        if env in envs:
+            return env
+    return None if latest is None else latest[1]
+
+def stamp(row, env):
+    """
+    :param row: list of column strings
+    :param env: environment fingerprint
+    :return : row with the env and timestamp columns appended
+    """
+    return row + [env, str(time.time())]
+
+def refine(points, slope_tol=0.25):
+    """
+    Propose new grid points where the timing curve changes slope. Slopes are taken
+    in log-log space between neighbouring points, and both intervals around a point
+    whose slope changes by more than slope_tol get their integer midpoint.
+    :param points: dict mapping x (int > 0) to measured y (> 0)
+    :param slope_tol: slope change that triggers refinement
+    :return : sorted list of new x values not yet in points
+    """
+    xs = sorted(points)
+    slopes = []
+    for i in range(0, len(xs) - 1):
+        y0 = max(points[xs[i]], 1e-12)
+        y1 = max(points[xs[i + 1]], 1e-12)
+        slopes.append((math.log(y1) - math.log(y0)) / (math.log(xs[i + 1]) - math.log(xs[i])))
+    new = set()
+    for i in range(1, len(slopes)):
+        if abs(slopes[i] - slopes[i - 1]) > slope_tol:
+            for lo, hi in ((xs[i - 1], xs[i]), (xs[i], xs[i + 1])):
+                mid = (lo + hi) // 2
+                if mid not in points and mid != lo:
+                    new.add(mid)
+    return sorted(new)
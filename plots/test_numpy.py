@@ -1,12 +1,20 @@
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import time
+import os
+import sys
 import csv
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import backend as bk
+import sweep
+import report
 """
 This is a set of functions to create plots tracking the performance of various numpy functions that have importance to machine learning tasks.
+Array functions are looked up on the active backend (see decomposition/backend.py).
+Results are written to data/numpy_*<backend suffix>.csv in the ';' row format of the bench
+scripts, and the figures are drawn from them by the report stage (report.py).
 """
 
+def _writer(csvfile):
+    return csv.writer(csvfile, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+
 
 def test_matrix_creation(max_dim_size, interval, num_samples):
     """
@@ -17,30 +25,15 @@ def test_matrix_creation(max_dim_size, interval, num_samples):
     :param interval: interval to increment by
     :param num_samples: number of samples to average over
     """
-    dims = []
-    times = []
-    dim = 1
-    while dim <= max_dim_size:
-        print(dim * dim)
-        start = time.time()
-        for i in range(0, num_samples):
-            np.random.standard_normal((dim, dim))
-        end = time.time()
-        dims.append(dim)
-        times.append((end - start) / num_samples)
-        dim += interval
-    plt.xlabel("Matrix dimension (square matrix)")
-    plt.ylabel("Time elapsed (sec)")
-    plt.title('Random Gaussian Matrix Generation Benchmarking')
-    plt.plot(dims, times)
-    plt.xscale('log')
-    plt.tight_layout()
-    plt.savefig('test_matrix_creation.eps', format='eps', dpi=1000)
-    with open('data_matrix_creation.csv', 'w') as csvfile:
-        writer = csv.writer(csvfile, delimiter=';',
-                quotechar='|', quoting=csv.QUOTE_MINIMAL)
-        for i in range(0, len(dims)):
-            writer.writerow(['dimension:('+str(dims[i])+'),time:'+str(times[i])+',num_samples:'+str(num_samples)])
+    xp = bk.get_backend()
+    with open('data/numpy_matrix_creation' + xp.suffix + '.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        dim = 1
+        while dim <= max_dim_size:
+            print(dim * dim)
+            elapsed = bk.time_call(lambda: xp.random.standard_normal((dim, dim)), num_samples, xp)
+            writer.writerow([str(dim), str(elapsed), str(num_samples)])
+            dim += interval
 
 def test_matrix_matrix_mult(max_d_size, max_k_size,
         d_interval, k_interval,
@@ -55,47 +48,17 @@ def test_matrix_matrix_mult(max_d_size, max_k_size,
         :param k_interval: interval to increase k by
         :param num_samples: number of samples to test each point for
     """
-    heatmap_data = {}
-    plt.tight_layout()
-    plt.figure(0)
-    rows = []
-    for k in range(1, max_k_size, k_interval):
-        dims = []
-        times = []
-        for d in range(1, max_d_size, d_interval):
-            print(d)
-            m1 = np.full((d,d), 0.5)
-            m2 = np.full((d, k), 0.5)
-            start = time.time()
-            for n in range(0, num_samples):
-                np.matmul(m1, m2)
-            end = time.time()
-            dims.append(d)
-            times.append((end - start) / num_samples)
-            rows.append('dimension:('+str(d)+','+str(k)+'),time:'+str(end-start)+',num_samples:'+str(num_samples))
-        plt.plot(dims, times, label='k = ' + str(k))
-        heatmap_data[k] = times 
-    plt.xlabel("Matrix dimension (square matrix) for first")
-    plt.ylabel("Time elapsed (sec)")
-    plt.xscale('log')
-    plt.title("Matrix by Matrix Multiplication Benchmark")
-    plt.legend(loc='best')
-    plt.savefig('test_matrix_matrix_mult.eps', format='eps', dpi=1000)
-    plt.figure(1)
-    plt.xscale('linear')
-    plt.xlim(0, int(max_d_size / d_interval))
-    df = pd.DataFrame(heatmap_data)
-    plt.pcolor(df.T)
-    plt.ylabel("Second matrix dimension (k)")
-    plt.xlabel("First matrix dimension (d/"+str(d_interval)+")")
-    plt.colorbar()
-    plt.title('Matrix by Matrix Multiplication Heatmap')
-    plt.savefig('test_matrix_matrix_mult_heatmap.eps', format='eps', dpi=1000)
-    with open('data_matrix_matrix_mult.csv', 'w') as csvfile:
-        writer = csv.writer(csvfile, delimiter=';',
-                quotechar='|', quoting=csv.QUOTE_MINIMAL)
-        for i in range(0, len(rows)):
-            writer.writerow([rows[i]])
+    xp = bk.get_backend()
+    env = sweep.env_key(xp)
+    with open('data/numpy_mm_mult' + xp.suffix + '.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for k in range(1, max_k_size, k_interval):
+            for d in range(1, max_d_size, d_interval):
+                print(d)
+                m1 = xp.full((d,d), 0.5)
+                m2 = xp.full((d, k), 0.5)
+                elapsed = bk.time_call(lambda: xp.matmul(m1, m2), num_samples, xp)
+                writer.writerow(sweep.stamp([str(d), str(k), str(elapsed), str(num_samples)], env))
 
 def test_inner_product_mult(max_d_size, d_interval, num_samples):
     """
@@ -105,30 +68,17 @@ def test_inner_product_mult(max_d_size, d_interval, num_samples):
     :param d_interval: interval to increment by
     :param num_samples: number of samples to average over to obtain each point
     """
-    dims = []
-    times = []
-    for d in range(1, max_d_size, d_interval):
-        v1 = np.full((d), 0.5)
-        v2 = np.full((d), 0.5)
-        start = time.time()
-        for n in range(0, num_samples):
-            np.dot(v1, v2)
-        end = time.time()
-        dims.append(d)
-        times.append((end - start) / num_samples)
-    plt.figure(2)
-    plt.xlabel("Size of each vector")
-    plt.ylabel("Time elapsed (sec)")
-    plt.plot(dims, times)
-    plt.xscale('log')
-    plt.tight_layout()
-    plt.savefig('test_inner_product_mult.eps', format='eps', dpi=1000)
-    with open('data_inner_product.csv', 'w') as csvfile:
-        writer = csv.writer(csvfile, delimiter=';',
-                quotechar='|', quoting=csv.QUOTE_MINIMAL)
-        for i in range(0, len(dims)):
-            writer.writerow(['dimension:('+str(dims[i])+'),time:'+str(times[i])+',num_samples:'+str(num_samples)])
+    xp = bk.get_backend()
+    with open('data/numpy_inner_product' + xp.suffix + '.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for d in range(1, max_d_size, d_interval):
+            v1 = xp.full((d), 0.5)
+            v2 = xp.full((d), 0.5)
+            elapsed = bk.time_call(lambda: xp.dot(v1, v2), num_samples, xp)
+            writer.writerow([str(d), str(elapsed), str(num_samples)])
 
-test_matrix_creation(100, 10, 20)
-test_matrix_matrix_mult(100, 10, 10, 1, 20)
-test_inner_product_mult(100, 10, 20)
+if __name__ == '__main__':
+    test_matrix_creation(100, 10, 20)
+    test_matrix_matrix_mult(100, 10, 10, 1, 20)
+    test_inner_product_mult(100, 10, 20)
+    report.render_all()
@@ -1,14 +1,28 @@
 import tensorly.random as rnd
-import matplotlib.pyplot as plt
 import tensorly as tl
+import numpy as np
 import time
+import os
+import sys
+import csv
+import report
 from tensorly.decomposition import parafac
 from tensorly.decomposition import tucker
+from tensorly.decomposition import non_negative_parafac
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decomposition'))
+import cp_proto as cp
 """
 This is a set of functions for tracking the performance of various 
 tensorly functions that have importance to machine learning tasks.
+Each benchmark writes its points to data/tensorly_*.csv in the ';' row format of the bench
+scripts as they are measured, and the figures are drawn from them by the report stage (report.py).
+Rank sweeps store rows r;d;time;num_samples, with time summed over the samples.
 """
 
+def _writer(csvfile):
+    return csv.writer(csvfile, delimiter=';', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+
+
 def test_random_cp_creation(max_d_size, num_dims, d_interval, 
         max_rank, rank_interval, num_samples):
     """
@@ -22,26 +36,19 @@ def test_random_cp_creation(max_d_size, num_dims, d_interval,
     :param rank_interval: size of interval for rank to jump by for each data point
     :param num_samples: number of items to sample over for each data point
     """
-    for r in range(1, max_rank, rank_interval):
-        dims = []
-        times = []
-        for d in range(1, max_d_size, d_interval):
-            time_sum = 0
-            for n in range(0, num_samples):
-                shp = tuple([d] * num_dims)
-                start = time.time()
-                rnd.cp_tensor(shp, r)
-                end = time.time()
-                time_sum += end - start
-            dims.append(d)
-            times.append(time_sum / num_samples)
-        plt.plot(dims, times, label='r = ' + str(r))
-    plt.xlabel("Matrix dimension (square matrix)")
-    plt.ylabel("Time elapsed (sec)")
-    plt.title('Random CP-Decomposable Tensor Generation Benchmarking')
-    plt.tight_layout()
-    plt.legend(loc='best')
-    plt.savefig('test_random_cp_creation.eps', format='eps', dpi=1000)
+    with open('data/tensorly_random_cp_creation.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for r in range(1, max_rank, rank_interval):
+            for d in range(1, max_d_size, d_interval):
+                time_sum = 0
+                for n in range(0, num_samples):
+                    shp = tuple([d] * num_dims)
+                    start = time.time()
+                    rnd.cp_tensor(shp, r)
+                    end = time.time()
+                    time_sum += end - start
+                writer.writerow([str(r), str(d), str(time_sum), str(num_samples)])
+                csvfile.flush()
 
 def test_random_tucker_creation(max_d_size, num_dims, d_interval, 
         max_rank, rank_interval, num_samples):
@@ -56,26 +63,19 @@ def test_random_tucker_creation(max_d_size, num_dims, d_interval,
     :param rank_interval: size of interval for rank to jump by for each data point
     :param num_samples: number of items to sample over for each data point
     """
-    for r in range(1, max_rank, rank_interval):
-        dims = []
-        times = []
-        for d in range(1, max_d_size, d_interval):
-            time_sum = 0
-            for n in range(0, num_samples):
-                shp = tuple([d] * num_dims)
-                start = time.time()
-                rnd.tucker_tensor(shp, r)
-                end = time.time()
-                time_sum += end - start
-            dims.append(d)
-            times.append(time_sum / num_samples)
-            plt.plot(dims, times, label='r = ' + str(r))
-    plt.xlabel("Matrix dimension (square matrix)")
-    plt.ylabel("Time elapsed (sec)")
-    plt.title('Random Tucker-Decomposable Tensor Generation Benchmarking')
-    plt.tight_layout()
-    plt.legend(loc='best')
-    plt.savefig('test_random_tucker_creation.eps', format='eps', dpi=1000)
+    with open('data/tensorly_random_tucker_creation.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for r in range(1, max_rank, rank_interval):
+            for d in range(1, max_d_size, d_interval):
+                time_sum = 0
+                for n in range(0, num_samples):
+                    shp = tuple([d] * num_dims)
+                    start = time.time()
+                    rnd.tucker_tensor(shp, r)
+                    end = time.time()
+                    time_sum += end - start
+                writer.writerow([str(r), str(d), str(time_sum), str(num_samples)])
+                csvfile.flush()
 
 def test_cp_decomposition(max_d_size, num_dims, d_interval,
         max_rank, rank_interval, num_samples):
@@ -91,26 +91,21 @@ def test_cp_decomposition(max_d_size, num_dims, d_interval,
     :param num_samples: number of items to sample over for each data point
     """
     rand_state = 5
-    for r in range(1, max_rank, rank_interval):
-        dims = []
-        times = []
-        for d in range(2, max_d_size, d_interval):
-            time_sum = 0
-            print(d)
-            for n in range(0, num_samples):
-                shp = tuple([d] * num_dims)
-                t = rnd.cp_tensor(shp, r, full=True, random_state=rand_state)
-                start = time.time()
-                parafac(t, rank=r, tol=10e-6, random_state=rand_state)
-                end = time.time()
-                time_sum += end - start
-            dims.append(d)
-            times.append(time_sum / num_samples)
-        plt.plot(dims, times, label='r = ' + str(r))
-    plt.xlabel("Matrix dimension (square matrix)")
-    plt.ylabel("Time elapsed (sec)")
-    plt.legend(loc='best')
-    plt.savefig('test_cp_decomposition.eps', format='eps', dpi=1000)
+    with open('data/tensorly_cp_decomposition.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for r in range(1, max_rank, rank_interval):
+            for d in range(2, max_d_size, d_interval):
+                time_sum = 0
+                print(d)
+                for n in range(0, num_samples):
+                    shp = tuple([d] * num_dims)
+                    t = rnd.cp_tensor(shp, r, full=True, random_state=rand_state)
+                    start = time.time()
+                    parafac(t, rank=r, tol=10e-6, random_state=rand_state)
+                    end = time.time()
+                    time_sum += end - start
+                writer.writerow([str(r), str(d), str(time_sum), str(num_samples)])
+                csvfile.flush()
 
 def test_tucker_decomposition(max_d_size, num_dims, d_interval,
         max_rank, rank_interval, num_samples):
@@ -126,33 +121,74 @@ def test_tucker_decomposition(max_d_size, num_dims, d_interval,
     :param num_samples: number of items to sample over for each data point
     """
     rand_state = 5
-    for r in range(1, max_rank, rank_interval):
-        dims = []
-        times = []
-        for d in range(r, max_d_size, d_interval):
-            time_sum = 0
-            print(d)
-            for n in range(0, num_samples):
-                shp = tuple([d] * num_dims)
-                t = rnd.tucker_tensor(shp, r, full=True, random_state=rand_state)
-                start = time.time()
-                tucker(t, tol=10e-6, random_state=rand_state)
-                end = time.time()
-                time_sum += end - start
-            dims.append(d)
-            times.append(time_sum / num_samples)
-        plt.plot(dims, times, label='r = ' + str(r))
-    plt.xlabel("Matrix dimension (square matrix)")
-    plt.ylabel("Time elapsed (sec)")
-    plt.legend(loc='best')
-    plt.savefig('test_tucker_decomposition.eps', format='eps', dpi=1000)
-
-test_random_cp_creation(500, 4, 10, 5, 5, 20)
-test_random_tucker_creation(500, 4, 10, 5, 5, 20)
-test_tucker_decomposition(50, 4, 10, 4, 5, 20)
-test_tucker_decomposition(50, 4, 10, 4, 5, 20)
-
-
-            
+    with open('data/tensorly_tucker_decomposition.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for r in range(1, max_rank, rank_interval):
+            for d in range(r, max_d_size, d_interval):
+                time_sum = 0
+                print(d)
+                for n in range(0, num_samples):
+                    shp = tuple([d] * num_dims)
+                    t = rnd.tucker_tensor(shp, r, full=True, random_state=rand_state)
+                    start = time.time()
+                    tucker(t, tol=10e-6, random_state=rand_state)
+                    end = time.time()
+                    time_sum += end - start
+                writer.writerow([str(r), str(d), str(time_sum), str(num_samples)])
+                csvfile.flush()
 
+def test_nonnegative_cp_decomposition(max_d_size, num_dims, d_interval,
+        max_rank, rank_interval, num_samples, n_iter_max=100):
+    """
+    Purpose:
+        benchmark cp_proto.ncp_hals against tensorly's non_negative_parafac on the same
+        randomly generated nonnegative CP decomposable tensors, timing both and
+        reporting the relative reconstruction error reached. Rows of
+        data/tensorly_nonnegative_cp.csv are method;r;d;time;mean relative error;num_samples
+        run tests using hypercube tensors for consistency
+    :param max_d_size: maximum dimension size that each mode will reach
+    :param num_dims: number of dimensions to test along
+    :param d_interval: size of interval to jump by for each data point
+    :param max_rank: maximum rank to test against
+    :param rank_interval: size of interval for rank to jump by for each data point
+    :param num_samples: number of items to sample over for each data point
+    :param n_iter_max: iteration budget given to both solvers
+    """
+    rand_state = 5
+    with open('data/tensorly_nonnegative_cp.csv', 'w') as csvfile:
+        writer = _writer(csvfile)
+        for r in range(1, max_rank, rank_interval):
+            for d in range(2, max_d_size, d_interval):
+                time_sum = {'ncp_hals': 0, 'non_negative_parafac': 0}
+                err_sum = {'ncp_hals': 0, 'non_negative_parafac': 0}
+                print(d)
+                for n in range(0, num_samples):
+                    shp = tuple([d] * num_dims)
+                    t = tl.to_numpy(rnd.random_cp(shp, r, full=True, random_state=rand_state))
+                    norm_t = np.linalg.norm(t)
+                    start = time.time()
+                    lambdas, factors = cp.ncp_hals(t, r, n_iter_max, 0, tol=10e-6, random_state=rand_state)
+                    end = time.time()
+                    time_sum['ncp_hals'] += end - start
+                    err_ours = np.linalg.norm(t - cp.recomp(factors, lambdas, shp)) / norm_t
+                    start = time.time()
+                    res = non_negative_parafac(tl.tensor(t), rank=r, n_iter_max=n_iter_max, tol=10e-6,
+                            random_state=rand_state)
+                    end = time.time()
+                    time_sum['non_negative_parafac'] += end - start
+                    err_tl = np.linalg.norm(t - tl.to_numpy(tl.cp_to_tensor(res))) / norm_t
+                    err_sum['ncp_hals'] += err_ours
+                    err_sum['non_negative_parafac'] += err_tl
+                    print('  relative error ncp_hals %.2e, non_negative_parafac %.2e' % (err_ours, err_tl))
+                for name in time_sum:
+                    writer.writerow([name, str(r), str(d), str(time_sum[name]),
+                        str(err_sum[name] / num_samples), str(num_samples)])
+                csvfile.flush()
 
+if __name__ == '__main__':
+    test_random_cp_creation(500, 4, 10, 5, 5, 20)
+    test_random_tucker_creation(500, 4, 10, 5, 5, 20)
+    test_tucker_decomposition(50, 4, 10, 4, 5, 20)
+    test_tucker_decomposition(50, 4, 10, 4, 5, 20)
+    test_nonnegative_cp_decomposition(50, 3, 10, 6, 5, 5)
+    report.render_all()